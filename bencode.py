@@ -0,0 +1,93 @@
+import hashlib
+
+
+class BencodeError(ValueError):
+    """
+    Ошибка разбора данных в формате bencode
+    """
+
+
+def _decode(data, pos, spans):
+    """
+    Разбирает значение, начинающееся в позиции pos
+
+    Args:
+        data (bytes): Данные в формате bencode
+        pos (int): Позиция начала значения
+        spans (dict): Сюда записываются границы значения ключа info верхнего уровня
+
+    Returns:
+        tuple: (значение, позиция следующего значения)
+    """
+    try:
+        token = data[pos:pos + 1]
+
+        if token == b'i':
+            end = data.index(b'e', pos)
+            return int(data[pos + 1:end]), end + 1
+
+        if token == b'l':
+            items = []
+            pos += 1
+            while data[pos:pos + 1] != b'e':
+                item, pos = _decode(data, pos, None)
+                items.append(item)
+            return items, pos + 1
+
+        if token == b'd':
+            result = {}
+            pos += 1
+            while data[pos:pos + 1] != b'e':
+                key, pos = _decode(data, pos, None)
+                value_start = pos
+                value, pos = _decode(data, pos, None)
+                result[key] = value
+                if spans is not None and key == b'info':
+                    spans['info'] = (value_start, pos)
+            return result, pos + 1
+
+        if token.isdigit():
+            colon = data.index(b':', pos)
+            length = int(data[pos:colon])
+            start = colon + 1
+            if start + length > len(data):
+                raise BencodeError("Строка выходит за границы данных")
+            return data[start:start + length], start + length
+    except (ValueError, IndexError) as e:
+        if isinstance(e, BencodeError):
+            raise
+        raise BencodeError(f"Некорректные данные в позиции {pos}: {e}")
+
+    raise BencodeError(f"Неизвестный тип значения в позиции {pos}")
+
+
+def decode(data):
+    """
+    Разбирает данные в формате bencode
+
+    Args:
+        data (bytes): Данные в формате bencode
+
+    Returns:
+        Разобранное значение (int, bytes, list или dict)
+    """
+    value, _ = _decode(data, 0, None)
+    return value
+
+
+def info_hash(torrent_data):
+    """
+    Вычисляет info-hash торрента: SHA-1 от исходных байтов словаря info
+
+    Args:
+        torrent_data (bytes): Содержимое .torrent файла
+
+    Returns:
+        str: Info-hash в шестнадцатеричном виде (верхний регистр, как в API трекера)
+    """
+    spans = {}
+    metainfo, _ = _decode(torrent_data, 0, spans)
+    if not isinstance(metainfo, dict) or 'info' not in spans:
+        raise BencodeError("В торрент-файле нет словаря info")
+    start, end = spans['info']
+    return hashlib.sha1(torrent_data[start:end]).hexdigest().upper()
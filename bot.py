@@ -1,9 +1,7 @@
 import os
-import schedule
 import time
 import logging
 from logging.handlers import RotatingFileHandler
-from threading import Thread
 import telegram
 from telegram.ext import (
     Updater, CommandHandler, CallbackQueryHandler, MessageHandler,
@@ -15,113 +13,126 @@ import sys
 from config import (
     check_required_env_vars, BOT_TOKEN, CHECK_INTERVAL, RUTRACKER_USERNAME, 
     RUTRACKER_PASSWORD, WAITING_URL, LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, 
-    USE_PROXY, HTTP_PROXY, HTTPS_PROXY, TIMEZONE, QBITTORRENT_ENABLED
+    USE_PROXY, HTTP_PROXY, HTTPS_PROXY, TIMEZONE, QBITTORRENT_ENABLED,
+    PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES, FETCH_CONCURRENCY,
+    TRACKER_PAGE_RATE, TRACKER_PAGE_BURST, TRACKER_DOWNLOAD_RATE, TRACKER_DOWNLOAD_BURST,
+    COOKIE_FILE, BULK_CHECK_ENABLED, TRACKER_API_URL, TRACKER_HTTP_CLIENT, HTTP_KEEPALIVE_EXPIRY,
+    PROXY_LIST, PROXY_CHECK_INTERVAL, PROXY_CHECK_URL,
+    ADAPTIVE_CHECK_ENABLED, CHECK_INTERVAL_MIN, CHECK_INTERVAL_MAX, CHECK_SMOOTHING, CHECK_BATCH_SIZE,
+    PARSE_PROCESSES
 )
 from database import init_db, init_users_db
 from utils import check_pages
+from check_scheduler import CheckScheduler
+from job_scheduler import JobScheduler
+from check_cycle import CheckCoordinator
 from handlers import (
     start, add_with_arg, add_start, add_url, cancel_add, list_pages, 
     update_page_cmd, check_now, toggle_subscription, subscription_status,
     list_users, make_admin, remove_admin, add_user_cmd, delete_user_cmd,
     user_help_cmd, button, handle_text, set_dependencies, 
-    force_download, clean_files_dir, delete_all_pages
+    force_download, clean_files_dir, delete_all_pages, tracker_status, set_page_interval
 )
 
-# Устанавливаем переменную окружения TZ
-os.environ['TZ'] = TIMEZONE
-try:
-    time.tzset()
-except AttributeError:
-    # Для Windows, tzset не доступен
-    pass
-
 # Глобальные переменные для доступа в других функциях
 rutracker_api = None
 BOT = None
+check_scheduler = None
+job_scheduler = None
+check_coordinator = None
+
+logger = logging.getLogger(__name__)
 
-# Создание директории для лог-файла, если она не существует
-log_dir = os.path.dirname(LOG_FILE)
-if log_dir and not os.path.exists(log_dir):
+def setup_logging():
+    """
+    Настраивает часовой пояс и логирование. Вызывается из main, а не при импорте модуля:
+    процессы пула разбора запускаются через spawn и импортируют bot.py как __mp_main__
+    """
+    # Устанавливаем переменную окружения TZ
+    os.environ['TZ'] = TIMEZONE
     try:
-        os.makedirs(log_dir)
-        print(f"Создана директория для логов: {log_dir}")
-    except Exception as e:
-        print(f"ОШИБКА: Невозможно создать директорию для логов {log_dir}: {e}")
-        sys.exit(1)
+        time.tzset()
+    except AttributeError:
+        # Для Windows, tzset не доступен
+        pass
 
-# Настройка логирования
-# Сначала удаляем существующие обработчики, если они есть
-root_logger = logging.getLogger()
-for handler in root_logger.handlers[:]:
-    root_logger.removeHandler(handler)
+    # Создание директории для лог-файла, если она не существует
+    log_dir = os.path.dirname(LOG_FILE)
+    if log_dir and not os.path.exists(log_dir):
+        try:
+            os.makedirs(log_dir)
+            print(f"Создана директория для логов: {log_dir}")
+        except Exception as e:
+            print(f"ОШИБКА: Невозможно создать директорию для логов {log_dir}: {e}")
+            sys.exit(1)
 
-# Настраиваем корневой логгер
-root_logger.setLevel(logging.DEBUG)
+    # Настройка логирования
+    # Сначала удаляем существующие обработчики, если они есть
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
 
-# Создание обработчиков
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
-file_handler.setLevel(logging.DEBUG)  # Записываем все в файл
-file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    # Настраиваем корневой логгер
+    root_logger.setLevel(logging.DEBUG)
 
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.INFO)  # В консоль только INFO и выше
-stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    # Создание обработчиков
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    file_handler.setLevel(logging.DEBUG)  # Записываем все в файл
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
-# Добавляем обработчики к корневому логгеру
-root_logger.addHandler(file_handler)
-root_logger.addHandler(stream_handler)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(logging.INFO)  # В консоль только INFO и выше
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
-# Настраиваем наш логгер
-logger = logging.getLogger(__name__)
+    # Добавляем обработчики к корневому логгеру
+    root_logger.addHandler(file_handler)
+    root_logger.addHandler(stream_handler)
 
-# Логи запуска
-logger.info("========== НАЧАЛО СЕССИИ ==========")
-logger.info(f"Файл логов: {LOG_FILE}")
-logger.info(f"Формат логов: {LOG_FORMAT}")
-logger.info(f"Интервал проверки: {CHECK_INTERVAL} минут")
-logger.info(f"Временная зона: {TIMEZONE}")
-logger.debug("Настройка логирования завершена успешно")
+    # Логи запуска
+    logger.info("========== НАЧАЛО СЕССИИ ==========")
+    logger.info(f"Файл логов: {LOG_FILE}")
+    logger.info(f"Формат логов: {LOG_FORMAT}")
+    logger.info(f"Интервал проверки: {CHECK_INTERVAL} минут")
+    logger.info(f"Временная зона: {TIMEZONE}")
+    logger.debug("Настройка логирования завершена успешно")
 
-def run_schedule_wrapper():
-    """Обертка для run_schedule с обработкой исключений для логирования"""
-    try:
-        logger.debug("Запуск потока планировщика задач")
-        run_schedule()
-    except Exception as e:
-        logger.error(f"Ошибка в потоке планировщика: {e}", exc_info=True)
-
-def run_schedule():
-    """Функция для выполнения запланированных задач"""
-    logger.debug("Функция run_schedule запущена")
-    last_run_time = None
-    
-    while True:
-        try:
-            now = time.time()
-            schedule.run_pending()
-            
-            # Логируем выполнение задач не чаще чем раз в минуту
-            if last_run_time is None or now - last_run_time >= 60:
-                logger.debug("Проверка запланированных задач")
-                last_run_time = now
-                
-            time.sleep(1)
-        except Exception as e:
-            logger.error(f"Ошибка при выполнении запланированных задач: {e}", exc_info=True)
-            time.sleep(10)  # Пауза перед повторной попыткой
+def next_check_delay():
+    """Задержка до ближайшей плановой проверки в секундах"""
+    # Не реже раза в минимальный интервал пересчитываем очередь, чтобы подхватить новые страницы
+    delay = CHECK_INTERVAL_MIN * 60
+    next_due = check_scheduler.next_due()
+    if next_due is not None:
+        delay = min(delay, max(0, next_due - time.time()))
+    return delay
 
 def scheduled_check():
-    """Функция для запланированной проверки страниц"""
+    """Функция для запланированной проверки страниц, время проверки которых наступило"""
+    due_pages = []
     try:
-        logger.debug(f"Запуск плановой проверки (интервал: {CHECK_INTERVAL} минут)")
-        result = check_pages(rutracker_api, BOT)
+        # Подхватываем добавленные и удаленные страницы и изменения интервалов
+        check_scheduler.refresh()
+        due_pages = check_scheduler.pop_due()
+        if not due_pages:
+            return False
+        
+        logger.debug(f"Запуск плановой проверки {len(due_pages)} страниц")
+        result = check_coordinator.run(due_pages, source="schedule")
         logger.debug(f"Плановая проверка завершена. Результат: {result}")
         return result
     except Exception as e:
         logger.error(f"Ошибка при плановой проверке: {e}", exc_info=True)
         return False
+    finally:
+        # Следующая проверка отсчитывается от last_checked с интервалом по новой истории обновлений,
+        # но не раньше минимального интервала после этой попытки
+        if due_pages:
+            try:
+                check_scheduler.refresh(due_pages, attempted=True)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении расписания проверок: {e}", exc_info=True)
 
 def main() -> None:
+    setup_logging()
     try:
         logger.debug("Запуск main функции")
         
@@ -137,7 +148,25 @@ def main() -> None:
         # Инициализация RutrackerAPI
         logger.debug("Инициализация RutrackerAPI")
         global rutracker_api
-        rutracker_api = RutrackerAPI(RUTRACKER_USERNAME, RUTRACKER_PASSWORD)
+        rutracker_api = RutrackerAPI(
+            RUTRACKER_USERNAME, RUTRACKER_PASSWORD,
+            cache_ttl=PAGE_CACHE_TTL,
+            cache_max_bytes=PAGE_CACHE_MAX_BYTES,
+            fetch_concurrency=FETCH_CONCURRENCY,
+            page_rate=TRACKER_PAGE_RATE,
+            page_burst=TRACKER_PAGE_BURST,
+            download_rate=TRACKER_DOWNLOAD_RATE,
+            download_burst=TRACKER_DOWNLOAD_BURST,
+            cookie_file=COOKIE_FILE,
+            bulk_check=BULK_CHECK_ENABLED,
+            api_url=TRACKER_API_URL,
+            transport=TRACKER_HTTP_CLIENT,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            proxy_list=PROXY_LIST,
+            proxy_check_interval=PROXY_CHECK_INTERVAL,
+            proxy_check_url=PROXY_CHECK_URL,
+            parse_workers=PARSE_PROCESSES
+        )
         
         # Инициализация бота
         logger.debug("Инициализация бота")
@@ -154,9 +183,23 @@ def main() -> None:
         global BOT
         BOT = updater.bot
         
+        # Очередь проверок с интервалом для каждой страницы
+        global check_scheduler
+        check_scheduler = CheckScheduler(
+            CHECK_INTERVAL * 60, CHECK_INTERVAL_MIN * 60, CHECK_INTERVAL_MAX * 60,
+            adaptive=ADAPTIVE_CHECK_ENABLED, smoothing=CHECK_SMOOTHING, batch_size=CHECK_BATCH_SIZE
+        )
+        check_scheduler.refresh()
+        
         # Передаем зависимости в модуль handlers
         logger.debug("Передача зависимостей в модуль handlers")
-        set_dependencies(rutracker_api, BOT)
+        # Все проверки (плановые и ручные) выполняются по одной через координатор циклов
+        global job_scheduler, check_coordinator
+        job_scheduler = JobScheduler()
+        check_coordinator = CheckCoordinator(
+            lambda page_ids, progress: check_pages(rutracker_api, BOT, page_ids=page_ids, progress=progress)
+        )
+        set_dependencies(rutracker_api, BOT, check_scheduler, job_scheduler, check_coordinator)
 
         # Регистрация обработчиков
         logger.debug("Регистрация обработчиков команд")
@@ -193,22 +236,28 @@ def main() -> None:
                 
         dispatcher.add_handler(CommandHandler("force", force_download))
         dispatcher.add_handler(CommandHandler("clean", clean_files_dir))
+        dispatcher.add_handler(CommandHandler("tracker", tracker_status))
+        dispatcher.add_handler(CommandHandler("interval", set_page_interval))
         logger.debug("Все обработчики команд зарегистрированы")
 
-        # Настройка и запуск планировщика задач
-        logger.debug(f"Настройка планировщика с интервалом {CHECK_INTERVAL} минут")
-        schedule.every(CHECK_INTERVAL).minutes.do(scheduled_check)
+        # Настройка и запуск планировщика задач: поток спит до срока ближайшей страницы
+        # и проверяет страницы, время проверки которых наступило по их собственному интервалу
+        logger.debug(f"Настройка планировщика: интервал {CHECK_INTERVAL} минут, "
+                     f"адаптивный {ADAPTIVE_CHECK_ENABLED} ({CHECK_INTERVAL_MIN}-{CHECK_INTERVAL_MAX} минут)")
+        job_scheduler.add_job("check", scheduled_check, next_check_delay)
 
         logger.debug("Запуск отдельного потока для планировщика")
-        schedule_thread = Thread(target=run_schedule_wrapper)
-        schedule_thread.daemon = True
-        schedule_thread.start()
+        job_scheduler.start()
 
         # Запуск бота
         logger.info("Бот запущен и готов к работе")
         updater.start_polling()
         updater.idle()  # Ждем до тех пор, пока бот не остановят
         
+        # Сохраняем cookie сессии, чтобы после перезапуска не авторизоваться заново
+        job_scheduler.stop()
+        rutracker_api.close()
+        
     except Exception as e:
         logger.critical(f"Критическая ошибка при запуске бота: {e}", exc_info=True)
         sys.exit(1)
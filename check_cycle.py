@@ -0,0 +1,214 @@
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CheckCycle:
+    """
+    Цикл проверки страниц (или другая задача, требующая монопольного доступа к страницам)
+    """
+    def __init__(self, cycle_id, source, page_ids=None, func=None):
+        """
+        Args:
+            cycle_id (int): Номер цикла
+            source (str): Кто запросил цикл (для логов и статуса)
+            page_ids (set): Страницы для проверки (None - все)
+            func (callable): Монопольная задача func(progress) вместо проверки страниц
+        """
+        self.id = cycle_id
+        self.sources = [source]
+        self.page_ids = page_ids
+        self.func = func
+        self.total = len(page_ids) if page_ids is not None else None
+        self.done = 0
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def kind(self):
+        return 'check' if self.func is None else self.sources[0]
+
+    def covers(self, page_ids):
+        """
+        Проверяет, охватывает ли цикл проверку указанных страниц
+
+        Args:
+            page_ids (set): Страницы (None - все)
+
+        Returns:
+            bool: True, если результат цикла подходит запросу
+        """
+        if self.func is not None:
+            return False
+        if self.page_ids is None:
+            return True
+        return page_ids is not None and page_ids <= self.page_ids
+
+    def progress(self, done, total):
+        """
+        Обновляет прогресс цикла (вызывается из выполняющей его функции)
+        """
+        self.done = done
+        self.total = total
+
+    def status(self):
+        """
+        Returns:
+            dict: Номер, источники, тип, прогресс и длительность цикла
+        """
+        now = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "sources": list(self.sources),
+            "pages": len(self.page_ids) if self.page_ids is not None else None,
+            "done": self.done,
+            "total": self.total,
+            "elapsed": round(now - self.started_at, 1) if self.started_at else None,
+            "result": self.result,
+        }
+
+
+class CheckCoordinator:
+    """
+    Координатор циклов проверки: одновременно выполняется только один цикл.
+    Запрос, который покрывается выполняющимся циклом, дожидается его результата;
+    остальные запросы объединяются в следующий цикл, который запускается сразу
+    после текущего. Монопольные задачи (например, принудительная загрузка)
+    выполняются в той же очереди и не пересекаются с проверками
+    """
+    def __init__(self, runner):
+        """
+        Args:
+            runner (callable): runner(page_ids, progress) - проверка страниц,
+                               page_ids=None означает все страницы
+        """
+        self.runner = runner
+        self._lock = threading.Lock()
+        self._active = None
+        self._draining = False
+        self._queue = deque()
+        self._last = None
+        self._next_id = 1
+        self.cycles = 0
+        self.joined = 0
+        self.merged = 0
+
+    def run(self, page_ids=None, source='manual', func=None):
+        """
+        Выполняет проверку страниц или монопольную задачу, не допуская параллельных циклов.
+        Блокирует вызывающий поток до завершения цикла, который выполнит запрос
+
+        Args:
+            page_ids (iterable): Страницы для проверки (None - все)
+            source (str): Кто запросил цикл
+            func (callable): Монопольная задача func(progress) вместо проверки страниц
+
+        Returns:
+            Результат цикла (для проверки - True, если найдены обновления)
+        """
+        page_ids = set(page_ids) if page_ids is not None else None
+        cycle, leader = self._enqueue(page_ids, source, func)
+        if leader:
+            self._drain()
+        else:
+            cycle.finished.wait()
+
+        if cycle.error is not None:
+            raise cycle.error
+        return cycle.result
+
+    def _enqueue(self, page_ids, source, func):
+        """
+        Возвращает (cycle, leader): цикл, который выполнит запрос, и признак того,
+        что вызывающий поток должен выполнять очередь циклов сам
+        """
+        with self._lock:
+            active = self._active
+            if func is None and active is not None and active.covers(page_ids):
+                self.joined += 1
+                active.sources.append(source)
+                logger.debug(f"Запрос проверки от {source} присоединен к выполняющемуся циклу {active.id}")
+                return active, False
+
+            # Проверки объединяются с уже ожидающим циклом проверки
+            pending = self._queue[-1] if self._queue else None
+            if func is None and pending is not None and pending.func is None:
+                if pending.page_ids is not None:
+                    pending.page_ids = pending.page_ids | page_ids if page_ids is not None else None
+                    pending.total = len(pending.page_ids) if pending.page_ids is not None else None
+                self.merged += 1
+                pending.sources.append(source)
+                logger.debug(f"Запрос проверки от {source} объединен с ожидающим циклом {pending.id}")
+                return pending, False
+
+            cycle = CheckCycle(self._next_id, source, page_ids, func)
+            self._next_id += 1
+            self._queue.append(cycle)
+            if self._draining:
+                logger.info(f"Цикл {cycle.id} ({cycle.kind}, {source}) поставлен в очередь "
+                            f"после выполняющегося цикла")
+                return cycle, False
+            self._draining = True
+            return cycle, True
+
+    def _drain(self):
+        """
+        Выполняет циклы из очереди, пока она не опустеет
+        """
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._draining = False
+                    return
+                cycle = self._queue.popleft()
+                self._active = cycle
+                cycle.started_at = time.time()
+
+            logger.info(f"Начат цикл {cycle.id} ({cycle.kind}, запросили: {', '.join(cycle.sources)})")
+            try:
+                if cycle.func is not None:
+                    cycle.result = cycle.func(cycle.progress)
+                else:
+                    cycle.result = self.runner(cycle.page_ids, cycle.progress)
+            except Exception as e:
+                logger.error(f"Ошибка в цикле {cycle.id}: {e}", exc_info=True)
+                cycle.error = e
+            cycle.finished_at = time.time()
+            logger.info(f"Цикл {cycle.id} завершен за {cycle.finished_at - cycle.started_at:.1f} сек")
+
+            with self._lock:
+                self.cycles += 1
+                self._active = None
+                self._last = cycle
+            cycle.finished.set()
+
+    def active_status(self):
+        """
+        Returns:
+            dict or None: Состояние выполняющегося цикла или None
+        """
+        with self._lock:
+            return self._active.status() if self._active else None
+
+    def status(self):
+        """
+        Returns:
+            dict: Выполняющийся цикл, ожидающие циклы, последний завершенный цикл и счетчики
+        """
+        with self._lock:
+            return {
+                "active": self._active.status() if self._active else None,
+                "queued": [cycle.status() for cycle in self._queue],
+                "last": self._last.status() if self._last else None,
+                "cycles": self.cycles,
+                "joined": self.joined,
+                "merged": self.merged,
+            }
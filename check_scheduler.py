@@ -0,0 +1,288 @@
+import time
+import math
+import zlib
+import heapq
+import logging
+import threading
+from datetime import datetime
+from statistics import median
+from database import get_schedule_info, get_page_updates
+from topic_parser import parse_tracker_date
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def to_timestamp(value):
+    """
+    Преобразует время из базы данных в timestamp
+
+    Args:
+        value (str): Время в формате '%Y-%m-%d %H:%M:%S'
+
+    Returns:
+        float or None: Timestamp или None, если время не задано или некорректно
+    """
+    try:
+        return datetime.strptime(value, TIME_FORMAT).timestamp() if value else None
+    except ValueError:
+        return None
+
+
+def estimate_interval(history, now, default, floor, ceiling, checks_per_update=4):
+    """
+    Оценивает интервал проверки раздачи по истории ее обновлений: раздача
+    проверяется несколько раз за типичный промежуток между обновлениями,
+    а если она молчит дольше обычного, проверки становятся реже
+
+    Args:
+        history (list): [(date, detected_at), ...] от старых к новым
+        now (float): Текущее время (timestamp)
+        default (float): Интервал без истории в секундах
+        floor (float): Минимальный интервал в секундах
+        ceiling (float): Максимальный интервал в секундах
+        checks_per_update (int): Сколько проверок приходится на типичный промежуток
+
+    Returns:
+        float: Интервал проверки в секундах
+    """
+    interval = default
+    if len(history) >= 2:
+        # Промежутки считаем по датам трекера, если они распознаются, иначе по времени обнаружения
+        update_times = [parse_tracker_date(date) for date, _ in history]
+        if all(update_times):
+            update_times = [update_time.timestamp() for update_time in update_times]
+        else:
+            update_times = [to_timestamp(detected_at) or 0 for _, detected_at in history]
+        gaps = [later - earlier for earlier, later in zip(update_times, update_times[1:]) if later > earlier]
+
+        if gaps:
+            last_detected = to_timestamp(history[-1][1]) or now
+            expected_gap = max(median(gaps), now - last_detected)
+            interval = expected_gap / checks_per_update
+
+    return min(max(interval, floor), ceiling)
+
+
+def slot_time(page_id, earliest, interval):
+    """
+    Возвращает ближайший слот проверки страницы не раньше earliest. Слоты страницы
+    идут с шагом interval со смещением, которое постоянно для страницы и равномерно
+    распределено по интервалу, поэтому проверки разных страниц не совпадают по времени
+
+    Args:
+        page_id (int): ID страницы
+        earliest (float): Самое раннее допустимое время (timestamp)
+        interval (float): Интервал проверки в секундах
+
+    Returns:
+        float: Время слота (timestamp)
+    """
+    phase = zlib.crc32(str(page_id).encode()) / 2 ** 32 * interval
+    return phase + math.ceil((earliest - phase) / interval) * interval
+
+
+class CheckScheduler:
+    """
+    Планировщик проверок страниц: очередь с приоритетом по времени следующей
+    проверки. Интервал каждой страницы подбирается по частоте ее обновлений
+    в заданных границах (общих или заданных для страницы). В режиме сглаживания
+    проверки распределяются по интервалу в постоянных слотах страниц, а за один
+    цикл проверяется не больше batch_size страниц
+    """
+    def __init__(self, base_interval, min_interval, max_interval, adaptive=True,
+                 smoothing=False, batch_size=0):
+        """
+        Args:
+            base_interval (float): Интервал проверки без истории обновлений в секундах
+            min_interval (float): Минимальный интервал в секундах
+            max_interval (float): Максимальный интервал в секундах
+            adaptive (bool): Подбирать интервал по частоте обновлений; иначе всегда base_interval
+            smoothing (bool): Распределять проверки по интервалу вместо проверки всех страниц разом
+            batch_size (int): Максимум страниц за цикл в режиме сглаживания (0 - без ограничения)
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.adaptive = adaptive
+        self.smoothing = smoothing
+        self.batch_size = batch_size if smoothing else 0
+        self._heap = []
+        self._due = {}
+        self._last_checked = {}
+        self._attempted = {}
+        self._next_batch_at = 0
+        self.intervals = {}
+        self.deferred = 0
+        self._lock = threading.Lock()
+
+    def interval_for(self, min_interval, max_interval, history, now):
+        """
+        Вычисляет интервал проверки страницы
+
+        Args:
+            min_interval (int): Минимальный интервал страницы в минутах или None
+            max_interval (int): Максимальный интервал страницы в минутах или None
+            history (list): История обновлений страницы
+            now (float): Текущее время (timestamp)
+
+        Returns:
+            float: Интервал в секундах
+        """
+        floor = min_interval * 60 if min_interval else self.min_interval
+        ceiling = max_interval * 60 if max_interval else self.max_interval
+        ceiling = max(floor, ceiling)
+        if not self.adaptive:
+            return min(max(self.base_interval, floor), ceiling)
+        return estimate_interval(history, now, self.base_interval, floor, ceiling)
+
+    def refresh(self, page_ids=None, attempted=False):
+        """
+        Пересчитывает время следующей проверки по данным базы: last_checked
+        и истории обновлений. Новые страницы добавляются, удаленные исключаются.
+        Страница, проверка которой только что выполнялась, проверяется снова не раньше
+        чем через минимальный интервал, даже если last_checked не обновился (проверку
+        пропустили, пока трекер недоступен)
+
+        Args:
+            page_ids (iterable): Страницы для пересчета (по умолчанию все)
+            attempted (bool): Проверка страниц page_ids только что выполнялась
+        """
+        now = time.time()
+        rows = get_schedule_info()
+        history = get_page_updates()
+        wanted = set(page_ids) if page_ids is not None else None
+
+        with self._lock:
+            if attempted and wanted:
+                for page_id in wanted:
+                    self._attempted[page_id] = now
+            existing_ids = {row[0] for row in rows}
+            for page_id in list(self._due):
+                if page_id not in existing_ids:
+                    self._due.pop(page_id)
+                    self.intervals.pop(page_id, None)
+                    self._last_checked.pop(page_id, None)
+                    self._attempted.pop(page_id, None)
+
+            for page_id, last_checked, min_interval, max_interval in rows:
+                if wanted is not None and page_id not in wanted and page_id in self._due:
+                    continue
+                # Страница, выданная pop_due, пересчитывается только после своей проверки
+                if wanted is None and self._due.get(page_id) == float('inf'):
+                    continue
+                interval = self.interval_for(min_interval, max_interval, history.get(page_id, []), now)
+                last_checked_at = to_timestamp(last_checked)
+                if not last_checked_at:
+                    due = now
+                elif self.smoothing:
+                    # Ближайший слот страницы, но не раньше чем через полинтервала после проверки
+                    due = slot_time(page_id, last_checked_at + interval / 2, interval)
+                else:
+                    due = last_checked_at + interval
+                attempted_at = self._attempted.get(page_id)
+                if attempted_at:
+                    floor = min_interval * 60 if min_interval else self.min_interval
+                    due = max(due, attempted_at + floor)
+                self.intervals[page_id] = interval
+                self._last_checked[page_id] = last_checked_at or 0
+                self._push(page_id, due)
+
+    def _push(self, page_id, due):
+        """
+        Добавляет страницу в очередь (вызывается под блокировкой), если время ее проверки
+        изменилось. Устаревшие записи очереди не удаляются, а пропускаются при извлечении
+        """
+        if self._due.get(page_id) == due:
+            return
+        self._due[page_id] = due
+        heapq.heappush(self._heap, (due, page_id))
+        # Устаревших записей накопилось больше, чем актуальных: пересобираем очередь
+        if len(self._heap) > 2 * len(self._due) + 16:
+            self._heap = [(due, page_id) for page_id, due in self._due.items() if due != float('inf')]
+            heapq.heapify(self._heap)
+
+    def batch_pace(self):
+        """
+        Время, за которое при равномерной нагрузке проверяется batch_size страниц
+        (вызывается под блокировкой)
+
+        Returns:
+            float: Пауза между ограниченными циклами в секундах
+        """
+        pages_per_second = sum(1 / interval for interval in self.intervals.values() if interval)
+        return self.batch_size / pages_per_second if pages_per_second else 0
+
+    def pop_due(self, now=None):
+        """
+        Извлекает страницы, время проверки которых наступило. В режиме сглаживания
+        выдается не больше batch_size страниц, начиная с давно не проверявшихся;
+        остальные ждут следующего цикла, который начнется не раньше чем через batch_pace
+
+        Args:
+            now (float): Текущее время (timestamp)
+
+        Returns:
+            list: Идентификаторы страниц
+        """
+        now = now or time.time()
+        due_entries = []
+        with self._lock:
+            if self.batch_size and now < self._next_batch_at:
+                return []
+            seen = set()
+            while self._heap and self._heap[0][0] <= now:
+                due, page_id = heapq.heappop(self._heap)
+                if self._due.get(page_id) == due and page_id not in seen:
+                    seen.add(page_id)
+                    due_entries.append((due, page_id))
+
+            # due_entries содержит каждую страницу один раз: лимит и число отложенных считаются по страницам
+            if self.batch_size and len(due_entries) > self.batch_size:
+                due_entries.sort(key=lambda entry: self._last_checked.get(entry[1], 0))
+                for entry in due_entries[self.batch_size:]:
+                    heapq.heappush(self._heap, entry)
+                self.deferred = len(due_entries) - self.batch_size
+                due_entries = due_entries[:self.batch_size]
+                self._next_batch_at = now + self.batch_pace()
+                logger.debug(f"Отложена проверка {self.deferred} страниц до следующего цикла")
+            else:
+                self.deferred = 0
+
+            due_pages = []
+            for _, page_id in due_entries:
+                # Пока страница проверяется, повторно ее не выдаем
+                self._due[page_id] = float('inf')
+                due_pages.append(page_id)
+        return due_pages
+
+    def next_due(self):
+        """
+        Returns:
+            float or None: Время ближайшей проверки (timestamp) или None, если страниц нет
+        """
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(self._heap[0][0], self._next_batch_at) if self.batch_size else self._heap[0][0]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Количество страниц, ближайшая проверка и минимальный, средний
+                  и максимальный интервалы в минутах
+        """
+        with self._lock:
+            intervals = list(self.intervals.values())
+        next_due = self.next_due()
+        return {
+            "pages": len(intervals),
+            "next_check_in": max(0, round(next_due - time.time())) if next_due else None,
+            "min_interval": round(min(intervals) / 60, 1) if intervals else None,
+            "avg_interval": round(sum(intervals) / len(intervals) / 60, 1) if intervals else None,
+            "max_interval": round(max(intervals) / 60, 1) if intervals else None,
+            "deferred": self.deferred,
+        }
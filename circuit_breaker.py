@@ -0,0 +1,187 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value):
+    """
+    Разбирает заголовок Retry-After (число секунд или HTTP-дата)
+
+    Args:
+        value (str): Значение заголовка
+
+    Returns:
+        float or None: Пауза в секундах или None, если заголовок отсутствует или некорректен
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель запросов к трекеру. Следит за долей ошибок
+    в последних запросах и при сбоях временно запрещает запросы, увеличивая
+    паузу экспоненциально (со случайным разбросом) и учитывая Retry-After.
+    После паузы пропускает один пробный запрос
+    """
+    def __init__(self, window_size=20, min_failures=5, failure_rate=0.5,
+                 base_delay=30, max_delay=1800, jitter=0.2):
+        """
+        Инициализирует выключатель
+
+        Args:
+            window_size (int): Количество последних запросов для оценки доли ошибок
+            min_failures (int): Минимальное число ошибок в окне для срабатывания
+            failure_rate (float): Доля ошибок в окне для срабатывания
+            base_delay (float): Начальная пауза после срабатывания в секундах
+            max_delay (float): Максимальная пауза в секундах
+            jitter (float): Относительный случайный разброс паузы
+        """
+        self.min_failures = min_failures
+        self.failure_rate = failure_rate
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._outcomes = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.consecutive_trips = 0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def allow_request(self):
+        """
+        Проверяет, можно ли выполнить запрос
+
+        Returns:
+            bool: True, если запрос разрешен
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                logger.info("Пробный запрос к трекеру после паузы")
+                self.state = HALF_OPEN
+                self.probe_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def is_open(self):
+        """
+        Returns:
+            bool: True, если запросы к трекеру сейчас запрещены
+        """
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() < self.open_until
+            return self.state == HALF_OPEN and self.probe_in_flight
+
+    def record_success(self):
+        """
+        Учитывает успешный запрос
+        """
+        with self._lock:
+            self._outcomes.append(True)
+            if self.state != CLOSED:
+                logger.info("Трекер снова доступен, запросы возобновлены")
+                self.state = CLOSED
+                self.probe_in_flight = False
+                self.consecutive_trips = 0
+                self._outcomes.clear()
+
+    def release_probe(self):
+        """
+        Возвращает пробный запрос, завершившийся без ответа трекера (например, не удалась
+        авторизация): выключатель остается открытым, и следующий запрос снова станет пробным
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self.probe_in_flight:
+                self.state = OPEN
+                self.probe_in_flight = False
+
+    def record_failure(self, error=None, retry_after=None):
+        """
+        Учитывает неудачный запрос
+
+        Args:
+            error (str): Описание ошибки
+            retry_after (float): Пауза, запрошенная сервером (Retry-After)
+        """
+        with self._lock:
+            self._outcomes.append(False)
+            self.last_error = error
+
+            if self.state == HALF_OPEN:
+                self._trip(retry_after)
+                return
+
+            if self.state == OPEN:
+                return
+
+            failures = self._outcomes.count(False)
+            if retry_after is not None or (
+                failures >= self.min_failures
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._trip(retry_after)
+
+    def _trip(self, retry_after=None):
+        """
+        Переводит выключатель в открытое состояние (вызывается под блокировкой)
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** self.consecutive_trips))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        self.state = OPEN
+        self.open_until = time.monotonic() + delay
+        self.probe_in_flight = False
+        self.consecutive_trips += 1
+        self.trips += 1
+        logger.warning(f"Трекер недоступен ({self.last_error}), запросы приостановлены на {delay:.0f} сек")
+
+    def stats(self):
+        """
+        Возвращает состояние выключателя
+
+        Returns:
+            dict: Состояние, оставшаяся пауза и счетчики
+        """
+        with self._lock:
+            failures = self._outcomes.count(False)
+            return {
+                "state": self.state,
+                "retry_in": max(0, round(self.open_until - time.monotonic())) if self.state == OPEN else 0,
+                "recent_requests": len(self._outcomes),
+                "recent_failures": failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
@@ -32,6 +32,55 @@ HTTP_PROXY = os.environ.get('HTTP_PROXY', '')
 HTTPS_PROXY = os.environ.get('HTTPS_PROXY', '')
 TIMEZONE = os.environ.get('TIMEZONE', 'UTC')
 
+# Адаптивный интервал проверки: страницы, которые обновляются часто, проверяются чаще,
+# а давно не обновлявшиеся - реже, в пределах CHECK_INTERVAL_MIN..CHECK_INTERVAL_MAX (минуты)
+ADAPTIVE_CHECK_ENABLED = os.environ.get('ADAPTIVE_CHECK_ENABLED', 'false').lower() == 'true'
+CHECK_INTERVAL_MIN = int(os.environ.get('CHECK_INTERVAL_MIN', str(max(1, CHECK_INTERVAL // 4))))
+CHECK_INTERVAL_MAX = int(os.environ.get('CHECK_INTERVAL_MAX', str(CHECK_INTERVAL * 12)))
+
+# Сглаживание нагрузки: проверки распределяются по интервалу в постоянных слотах страниц,
+# за один цикл проверяется не больше CHECK_BATCH_SIZE страниц (0 - без ограничения)
+CHECK_SMOOTHING = os.environ.get('CHECK_SMOOTHING', 'false').lower() == 'true'
+CHECK_BATCH_SIZE = int(os.environ.get('CHECK_BATCH_SIZE', '10'))
+
+# Конвейер проверки страниц: размер очередей между этапами, число страниц в пачке запросов
+# и число потоков этапов разбора, скачивания, отправки в qBittorrent и уведомлений
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '16'))
+PIPELINE_FETCH_BATCH = int(os.environ.get('PIPELINE_FETCH_BATCH', '16'))
+PIPELINE_PARSE_WORKERS = int(os.environ.get('PIPELINE_PARSE_WORKERS', '1'))
+PIPELINE_DOWNLOAD_WORKERS = int(os.environ.get('PIPELINE_DOWNLOAD_WORKERS', '2'))
+PIPELINE_UPLOAD_WORKERS = int(os.environ.get('PIPELINE_UPLOAD_WORKERS', '2'))
+PIPELINE_NOTIFY_WORKERS = int(os.environ.get('PIPELINE_NOTIFY_WORKERS', '2'))
+
+# Число процессов для разбора страниц (0 - разбор в основном процессе)
+PARSE_PROCESSES = int(os.environ.get('PARSE_PROCESSES', '0'))
+
+# Пул прокси для запросов к RuTracker (через запятую); если не задан, используется HTTP_PROXY/HTTPS_PROXY
+PROXY_LIST = [proxy.strip() for proxy in os.environ.get('PROXY_LIST', '').split(',') if proxy.strip()]
+PROXY_CHECK_INTERVAL = int(os.environ.get('PROXY_CHECK_INTERVAL', '300'))  # секунды
+PROXY_CHECK_URL = os.environ.get('PROXY_CHECK_URL', 'https://rutracker.org/robots.txt')
+
+# Настройки кэша страниц RuTracker
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', '300'))  # секунды
+PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Число одновременных запросов к RuTracker при проверке страниц
+FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY', '4'))
+
+# HTTP-клиент для запросов к RuTracker: requests или httpx (пул соединений с HTTP/2)
+TRACKER_HTTP_CLIENT = os.environ.get('TRACKER_HTTP_CLIENT', 'requests').lower()
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', '30'))  # секунды
+
+# Ограничение частоты запросов к RuTracker (запросов в секунду и допустимый всплеск)
+TRACKER_PAGE_RATE = float(os.environ.get('TRACKER_PAGE_RATE', '1.0'))
+TRACKER_PAGE_BURST = int(os.environ.get('TRACKER_PAGE_BURST', '1'))
+TRACKER_DOWNLOAD_RATE = float(os.environ.get('TRACKER_DOWNLOAD_RATE', '0.5'))
+TRACKER_DOWNLOAD_BURST = int(os.environ.get('TRACKER_DOWNLOAD_BURST', '2'))
+
+# Пакетная проверка изменений раздач через API трекера
+BULK_CHECK_ENABLED = os.environ.get('BULK_CHECK_ENABLED', 'true').lower() == 'true'
+TRACKER_API_URL = os.environ.get('TRACKER_API_URL', 'https://api.rutracker.cc/v1/')
+
 # Настройки qBittorrent
 QBITTORRENT_ENABLED = os.environ.get('QBITTORRENT_ENABLED').lower() == 'true'
 QBITTORRENT_URL = os.environ.get('QBITTORRENT_URL')
@@ -44,6 +93,12 @@ QBITTORRENT_SAVE_PATH = os.environ.get('QBITTORRENT_SAVE_PATH', '')
 DB_PATH = get_env_var('DB_PATH')
 USERS_DB_PATH = get_env_var('USERS_DB_PATH')
 
+# Файл с cookie сессии RuTracker (по умолчанию рядом с базой страниц)
+COOKIE_FILE = os.environ.get(
+    'COOKIE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'rutracker_cookies.json')
+)
+
 # Состояния для ConversationHandler
 WAITING_URL = 1
 
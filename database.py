@@ -3,6 +3,7 @@ from datetime import datetime
 import os
 from contextlib import contextmanager
 from config import DB_PATH, USERS_DB_PATH, logger, FILE_DIR
+from torrent_store import TorrentStore
 
 # Контекстный менеджер для работы с базой данных
 @contextmanager
@@ -156,6 +157,28 @@ def init_db():
             if 'last_checked' not in columns:
                 logger.debug("Добавление столбца 'last_checked' в таблицу pages")
                 cursor.execute("ALTER TABLE pages ADD COLUMN last_checked TEXT")
+            if 'info_hash' not in columns:
+                logger.debug("Добавление столбца 'info_hash' в таблицу pages")
+                cursor.execute("ALTER TABLE pages ADD COLUMN info_hash TEXT")
+            # Границы интервала проверки страницы в минутах (NULL - общие настройки)
+            if 'min_interval' not in columns:
+                logger.debug("Добавление столбцов 'min_interval' и 'max_interval' в таблицу pages")
+                cursor.execute("ALTER TABLE pages ADD COLUMN min_interval INTEGER")
+                cursor.execute("ALTER TABLE pages ADD COLUMN max_interval INTEGER")
+            
+            # История версий торрент-файлов страниц (сами файлы лежат в хранилище по info-hash)
+            cursor.execute('''CREATE TABLE IF NOT EXISTS torrent_history (
+                            page_id INTEGER,
+                            info_hash TEXT,
+                            added_at TEXT,
+                            PRIMARY KEY (page_id, info_hash))''')
+            
+            # История дат обновления страниц для оценки частоты обновлений раздачи
+            cursor.execute('''CREATE TABLE IF NOT EXISTS page_updates (
+                            page_id INTEGER,
+                            date TEXT,
+                            detected_at TEXT)''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_page_updates_page ON page_updates (page_id)")
         
         logger.info("База данных страниц инициализирована")
     except Exception as e:
@@ -200,7 +223,7 @@ def find_first_available_id():
         logger.error(f"Ошибка при поиске доступного ID: {e}")
         return 1  # В случае ошибки возвращаем 1 и надеемся на лучшее
 
-def add_page(title, url, rutracker_api):
+def add_page(title, url, date=None):
     """Добавляет страницу в базу данных."""
     logger.debug(f"Добавление страницы '{title}' с URL: {url}")
     try:
@@ -211,30 +234,21 @@ def add_page(title, url, rutracker_api):
             logger.info(f"Страница с URL {url} уже существует с ID {page_id} и заголовком '{existing_title}'")
             return None, existing_title, page_id
         
+        last_checked = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with get_db_connection(DB_PATH) as conn:
             cursor = conn.cursor()
             free_id = find_first_available_id()
-            cursor.execute("INSERT INTO pages (id, title, url) VALUES (?, ?, ?)", 
-                        (free_id, title, url))
+            cursor.execute("INSERT INTO pages (id, title, url, date, last_checked) VALUES (?, ?, ?, ?, ?)", 
+                        (free_id, title, url, date, last_checked))
             page_id = free_id
+            if date:
+                cursor.execute("INSERT INTO page_updates (page_id, date, detected_at) VALUES (?, ?, ?)",
+                               (page_id, date, last_checked))
         
         logger.info(f"Страница '{title}' добавлена для мониторинга с ID {page_id}")
-
-        # Загрузка торрент-файла при добавлении новой страницы
-        logger.debug(f"Получение содержимого страницы для {url}")
-        page_content = rutracker_api.get_page_content(url)
-        new_date = rutracker_api.parse_date(page_content)
-        if new_date:
-            logger.debug(f"Обнаружена дата: {new_date}, скачивание торрент-файла")
-            torrent_file_path = os.path.join(FILE_DIR, f'{page_id}.torrent')
-            rutracker_api.download_torrent_by_url(url, torrent_file_path)
-            update_page_date(page_id, new_date)
-            logger.info(f"Торрент-файл для новой страницы '{title}' скачан в {torrent_file_path}")
-        else:
+        if not date:
             logger.warning(f"Не удалось определить дату для страницы с URL {url}")
         
-        update_last_checked(page_id)
-        
         return page_id, title, None
     except Exception as e:
         logger.error(f"Ошибка при добавлении страницы '{title}': {e}")
@@ -300,13 +314,17 @@ def update_page_url(page_id, new_url):
         raise
 
 def update_page_date(page_id, new_date):
-    """Обновляет дату страницы."""
+    """Обновляет дату страницы и добавляет ее в историю обновлений."""
+    detected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     logger.debug(f"Обновление даты для страницы с ID {page_id} на {new_date}")
     try:
         with get_db_connection(DB_PATH) as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE pages SET date = ? WHERE id = ?", (new_date, page_id))
             affected_rows = cursor.rowcount
+            if affected_rows > 0:
+                cursor.execute("INSERT INTO page_updates (page_id, date, detected_at) VALUES (?, ?, ?)",
+                               (page_id, new_date, detected_at))
         
         if affected_rows > 0:
             logger.info(f"Дата для страницы с ID {page_id} обновлена на {new_date}")
@@ -316,6 +334,91 @@ def update_page_date(page_id, new_date):
         logger.error(f"Ошибка при обновлении даты для страницы с ID {page_id}: {e}")
         raise
 
+def get_page_updates(limit=20):
+    """Возвращает последние даты обновления страниц: {page_id: [(date, detected_at), ...]} от старых к новым."""
+    logger.debug("Получение истории обновлений страниц")
+    try:
+        with get_db_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT page_id, date, detected_at FROM page_updates ORDER BY page_id, detected_at")
+            rows = cursor.fetchall()
+        
+        updates = {}
+        for row in rows:
+            updates.setdefault(row['page_id'], []).append((row['date'], row['detected_at']))
+        return {page_id: history[-limit:] for page_id, history in updates.items()}
+    except Exception as e:
+        logger.error(f"Ошибка при получении истории обновлений страниц: {e}")
+        return {}
+
+def get_schedule_info():
+    """Возвращает данные для планирования проверок: id, last_checked и границы интервала каждой страницы."""
+    logger.debug("Получение параметров проверки страниц")
+    try:
+        with get_db_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, last_checked, min_interval, max_interval FROM pages")
+            return [tuple(row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Ошибка при получении параметров проверки страниц: {e}")
+        return []
+
+def update_page_interval(page_id, min_interval, max_interval):
+    """Задает границы интервала проверки страницы в минутах (None - общие настройки)."""
+    logger.debug(f"Обновление границ интервала проверки для страницы с ID {page_id}: {min_interval}-{max_interval}")
+    try:
+        with get_db_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE pages SET min_interval = ?, max_interval = ? WHERE id = ?",
+                           (min_interval, max_interval, page_id))
+            affected_rows = cursor.rowcount
+        
+        if affected_rows > 0:
+            logger.info(f"Границы интервала проверки для страницы с ID {page_id}: {min_interval}-{max_interval} минут")
+        else:
+            logger.warning(f"Не удалось обновить границы интервала проверки для страницы с ID {page_id}")
+        return affected_rows > 0
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении границ интервала проверки для страницы с ID {page_id}: {e}")
+        raise
+
+def get_page_info_hash(page_id):
+    """Возвращает info-hash последнего скачанного торрент-файла страницы."""
+    logger.debug(f"Получение info-hash для страницы с ID {page_id}")
+    try:
+        with get_db_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT info_hash FROM pages WHERE id = ?", (page_id,))
+            result = cursor.fetchone()
+        
+        return result['info_hash'] if result else None
+    except Exception as e:
+        logger.error(f"Ошибка при получении info-hash для страницы с ID {page_id}: {e}")
+        return None
+
+def update_page_info_hash(page_id, info_hash):
+    """Обновляет info-hash торрент-файла страницы и добавляет версию в историю."""
+    added_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    logger.debug(f"Обновление info-hash для страницы с ID {page_id} на {info_hash}")
+    try:
+        with get_db_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE pages SET info_hash = ? WHERE id = ?", (info_hash, page_id))
+            affected_rows = cursor.rowcount
+            if affected_rows > 0:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO torrent_history (page_id, info_hash, added_at) VALUES (?, ?, ?)",
+                    (page_id, info_hash, added_at)
+                )
+        
+        if affected_rows > 0:
+            logger.info(f"Info-hash для страницы с ID {page_id} обновлен на {info_hash}")
+        else:
+            logger.warning(f"Не удалось обновить info-hash для страницы с ID {page_id}")
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении info-hash для страницы с ID {page_id}: {e}")
+        raise
+
 def update_last_checked(page_id):
     """Обновляет время последней проверки страницы."""
     last_checked = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -335,7 +438,7 @@ def update_last_checked(page_id):
         raise
 
 def delete_page(page_id):
-    """Удаляет страницу из базы данных и связанный торрент-файл."""
+    """Удаляет страницу из базы данных и связанные торрент-файлы. Возвращает число удаленных файлов."""
     logger.debug(f"Удаление страницы с ID {page_id}")
     try:
         with get_db_connection(DB_PATH) as conn:
@@ -345,8 +448,29 @@ def delete_page(page_id):
             cursor.execute("SELECT title, url FROM pages WHERE id = ?", (page_id,))
             page_info = cursor.fetchone()
             
+            # Версии торрент-файлов страницы
+            cursor.execute(
+                "SELECT info_hash FROM torrent_history WHERE page_id = ? "
+                "UNION SELECT info_hash FROM pages WHERE id = ? AND info_hash IS NOT NULL",
+                (page_id, page_id)
+            )
+            page_hashes = [row['info_hash'] for row in cursor.fetchall()]
+            
             cursor.execute("DELETE FROM pages WHERE id = ?", (page_id,))
             affected_rows = cursor.rowcount
+            cursor.execute("DELETE FROM torrent_history WHERE page_id = ?", (page_id,))
+            cursor.execute("DELETE FROM page_updates WHERE page_id = ?", (page_id,))
+            
+            # Файлы, на которые ссылаются другие страницы, остаются в хранилище
+            orphan_hashes = []
+            for torrent_hash in page_hashes:
+                cursor.execute(
+                    "SELECT 1 FROM torrent_history WHERE info_hash = ? "
+                    "UNION SELECT 1 FROM pages WHERE info_hash = ? LIMIT 1",
+                    (torrent_hash, torrent_hash)
+                )
+                if cursor.fetchone() is None:
+                    orphan_hashes.append(torrent_hash)
         
         if affected_rows > 0:
             if page_info:
@@ -355,16 +479,23 @@ def delete_page(page_id):
             else:
                 logger.info(f"Страница с ID {page_id} удалена")
                 
-            # Удаляем торрент-файл, если он существует
-            torrent_file_path = os.path.join(FILE_DIR, f'{page_id}.torrent')
-            if os.path.exists(torrent_file_path):
-                try:
-                    os.remove(torrent_file_path)
-                    logger.debug(f"Торрент-файл {torrent_file_path} удален")
-                except Exception as e:
-                    logger.error(f"Ошибка при удалении торрент-файла {torrent_file_path}: {e}")
+            deleted_files = 0
+            # Удаляем торрент-файлы, если они существуют
+            store = TorrentStore(FILE_DIR)
+            torrent_file_paths = [os.path.join(FILE_DIR, f'{page_id}.torrent')]
+            torrent_file_paths += [store.path_for(torrent_hash) for torrent_hash in orphan_hashes]
+            for torrent_file_path in torrent_file_paths:
+                if os.path.exists(torrent_file_path):
+                    try:
+                        os.remove(torrent_file_path)
+                        deleted_files += 1
+                        logger.debug(f"Торрент-файл {torrent_file_path} удален")
+                    except Exception as e:
+                        logger.error(f"Ошибка при удалении торрент-файла {torrent_file_path}: {e}")
+            return deleted_files
         else:
             logger.warning(f"Не удалось удалить страницу с ID {page_id} (возможно, не существует)")
+            return 0
     except Exception as e:
         logger.error(f"Ошибка при удалении страницы с ID {page_id}: {e}")
         raise
@@ -1,17 +1,25 @@
 import os
+import html
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext, ConversationHandler
 from config import logger, WAITING_URL, CHECK_INTERVAL, FILE_DIR
 from database import (
-    get_pages, get_page_by_id, update_page_url, add_page,
+    get_pages, get_page_by_id, update_page_url,
     user_exists, add_user, update_user_admin, update_user_sub, delete_user, get_users, delete_page,
-    update_last_checked
+    update_last_checked, update_page_info_hash, update_page_interval
 )
-from utils import check_pages, restricted, admin_required, upload_to_qbittorrent
+from utils import (
+    check_pages, restricted, admin_required, upload_to_qbittorrent, add_topic, get_torrent, pipeline_stats
+)
+from torrent_store import STALE_PART_AGE
 
 # Определим глобальные переменные, которые будут заполнены в main.py
 rutracker_api = None
 BOT = None
+check_scheduler = None
+job_scheduler = None
+check_coordinator = None
 
 # Создадим декораторы доступа
 restricted_decorator = restricted(user_exists, add_user, get_users)
@@ -43,6 +51,8 @@ def display_pages_list(update_or_query):
         interval_text = f"каждые {CHECK_INTERVAL} минут"
     
     title_text = f'Страницы для мониторинга (проверка {interval_text}):'
+    if check_scheduler and check_scheduler.adaptive:
+        title_text = f'Страницы для мониторинга (проверка {interval_text}, чаще для часто обновляемых):'
     
     keyboard = []
     if pages:
@@ -70,6 +80,37 @@ def display_pages_list(update_or_query):
     
     logger.info("Список страниц отображен")
 
+# Функция для отправки пользователю результата добавления страницы
+def reply_add_result(update, result, success_text):
+    user_id = update.effective_user.id
+    title = result['title']
+    
+    if result['page_id'] is None:
+        # Страница уже существует
+        update.message.reply_text(
+            f'Эта ссылка уже добавлена в мониторинг под названием "{title}" (ID: {result["existing_id"]}).',
+            reply_markup=ADD_MORE_KEYBOARD
+        )
+        logger.info(f"Попытка добавить дубликат URL пользователем {user_id}")
+        return
+    
+    update.message.reply_text(success_text, reply_markup=ADD_MORE_KEYBOARD)
+    logger.info(f"Страница {title} добавлена для мониторинга пользователем {user_id}")
+    
+    # Ставим новую страницу в очередь проверок сразу, а не при следующем пересчете
+    if check_scheduler:
+        check_scheduler.refresh([result['page_id']])
+    if job_scheduler:
+        job_scheduler.wake()
+    
+    downloaded_file = result['file_path']
+    if not downloaded_file:
+        update.message.reply_text("Не удалось скачать торрент-файл.")
+    elif result['uploaded']:
+        update.message.reply_text(f"Торрент-файл скачан и отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
+    else:
+        update.message.reply_text(f"Торрент-файл скачан, но не отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
+
 # Обработчики команд
 @restricted_decorator
 def start(update: Update, context: CallbackContext) -> None:
@@ -103,42 +144,8 @@ def add_with_arg(update: Update, context: CallbackContext) -> None:
     logger.debug(f"Получен URL для добавления от пользователя {user_id}")
     
     try:
-        title = rutracker_api.get_page_title(url)
-        logger.debug(f"Получен заголовок: {title}")
-        
-        page_id, title, existing_id = add_page(title, url, rutracker_api)
-        
-        if page_id is None:
-            # Страница уже существует
-            update.message.reply_text(
-                f'Эта ссылка уже добавлена в мониторинг под названием "{title}" (ID: {existing_id}).',
-                reply_markup=ADD_MORE_KEYBOARD
-            )
-            logger.info(f"Попытка добавить дубликат URL пользователем {user_id}")
-        else:
-            update.message.reply_text(
-                f'Страница {title} добавлена для мониторинга.',
-                reply_markup=ADD_MORE_KEYBOARD
-            )
-            logger.info(f"Команда /add выполнена пользователем {user_id} для страницы {title}")
-            
-            # Скачиваем торрент-файл
-            file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-            downloaded_file = rutracker_api.download_torrent_by_url(url, file_path)
-            
-            if downloaded_file:
-                # Отправляем торрент-файл в qBittorrent
-                qbit_result = upload_to_qbittorrent(downloaded_file)
-                
-                if qbit_result:
-                    update.message.reply_text(f"Торрент-файл скачан и отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                    logger.info(f"Торрент-файл для страницы {title} отправлен в qBittorrent")
-                else:
-                    update.message.reply_text(f"Торрент-файл скачан, но не отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                    logger.warning(f"Не удалось отправить торрент-файл для страницы {title} в qBittorrent")
-            else:
-                update.message.reply_text("Не удалось скачать торрент-файл.")
-                logger.error(f"Ошибка при скачивании торрент-файла для страницы {title}")
+        result = add_topic(url, rutracker_api)
+        reply_add_result(update, result, f'Страница {result["title"]} добавлена для мониторинга.')
     except Exception as e:
         update.message.reply_text(f'Произошла ошибка при обработке ссылки: {str(e)}')
         logger.error(f"Ошибка при обработке ссылки от пользователя {user_id}: {e}")
@@ -158,46 +165,8 @@ def add_url(update: Update, context: CallbackContext) -> int:
     logger.debug(f"Получена ссылка от пользователя {user_id}")
     
     try:
-        # Получаем заголовок страницы
-        title = rutracker_api.get_page_title(url)
-        logger.debug(f"Получен заголовок: {title}")
-        
-        # Добавляем страницу в базу данных
-        page_id, title, existing_id = add_page(title, url, rutracker_api)
-        
-        if page_id is None:
-            # Если страница уже существует
-            update.message.reply_text(
-                f'Эта ссылка уже добавлена в мониторинг под названием "{title}" (ID: {existing_id}).',
-                reply_markup=ADD_MORE_KEYBOARD
-            )
-            logger.info(f"Попытка добавить дубликат URL пользователем {user_id}")
-        else:
-            # Успешное добавление
-            update.message.reply_text(
-                f'Ссылку поймал и добавил в мониторинг.',
-                reply_markup=ADD_MORE_KEYBOARD
-            )
-            logger.info(f"Страница {title} добавлена для мониторинга пользователем {user_id}")
-            
-            # Скачиваем торрент-файл
-            logger.debug(f"Попытка скачать торрент-файл для ссылки: {url}")
-            file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-            downloaded_file = rutracker_api.download_torrent_by_url(url, file_path)
-            
-            if downloaded_file:
-                # Отправляем торрент-файл в qBittorrent
-                qbit_result = upload_to_qbittorrent(downloaded_file)
-                
-                if qbit_result:
-                    update.message.reply_text(f"Торрент-файл скачан и отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                    logger.info(f"Торрент-файл для страницы {title} отправлен в qBittorrent")
-                else:
-                    update.message.reply_text(f"Торрент-файл скачан, но не отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                    logger.warning(f"Не удалось отправить торрент-файл для страницы {title} в qBittorrent")
-            else:
-                update.message.reply_text("Не удалось скачать торрент-файл.")
-                logger.error(f"Ошибка при скачивании торрент-файла для страницы {title}")
+        result = add_topic(url, rutracker_api)
+        reply_add_result(update, result, 'Ссылку поймал и добавил в мониторинг.')
     except Exception as e:
         logger.error(f"Ошибка при обработке ссылки от пользователя {user_id}: {e}")
         update.message.reply_text(f'Произошла ошибка при обработке ссылки: {str(e)}')
@@ -250,6 +219,7 @@ def update_page_cmd(update: Update, context: CallbackContext) -> None:
         new_url = context.args[1]
         logger.debug(f"Обновление страницы с ID {page_id} пользователем {user_id}")
         
+        page = get_page_by_id(page_id)
         success, existing_id, existing_title = update_page_url(page_id, new_url)
         
         if not success:
@@ -258,6 +228,9 @@ def update_page_cmd(update: Update, context: CallbackContext) -> None:
             )
             logger.info(f"Попытка обновить на дублирующуюся ссылку пользователем {user_id}")
         else:
+            # Прежняя страница больше не отслеживается: убираем ее из кэша
+            if page:
+                rutracker_api.invalidate_page(page[2])
             update.message.reply_text(
                 f'Ссылка для страницы с ID {page_id} обновлена.',
                 reply_markup=BACK_TO_LIST_KEYBOARD
@@ -267,23 +240,96 @@ def update_page_cmd(update: Update, context: CallbackContext) -> None:
         update.message.reply_text('ID страницы должен быть числом.')
         logger.warning(f"Некорректный ID страницы в команде /update от {user_id}")
 
+# Функция для подстановки значения в сообщение с разметкой HTML
+def html_value(value):
+    return html.escape(str(value))
+
+# Функция для описания прогресса цикла проверки
+def format_cycle_progress(cycle):
+    if cycle['total'] is None:
+        return 'подготовка'
+    text = f"обработано {cycle['done']} из {cycle['total']} страниц"
+    if cycle['elapsed'] is not None:
+        text += f", {cycle['elapsed']} сек"
+    return text
+
 # Команда для запуска проверки вручную
 @admin_required_decorator
 def check_now(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     logger.debug(f"Команда /check от пользователя {user_id}")
     
-    update.message.reply_text('Запускаю проверку страниц на обновления...')
+    # Если проверка уже идет, не запускаем вторую параллельно: дожидаемся ее или следующего цикла
+    active = check_coordinator.active_status() if check_coordinator else None
+    if active:
+        update.message.reply_text(f'Проверка уже выполняется ({format_cycle_progress(active)}), '
+                                  f'результат будет после ее завершения...')
+    else:
+        update.message.reply_text('Запускаю проверку страниц на обновления...')
     logger.debug("Запуск ручной проверки страниц")
     
     # Выполняем проверку
-    updates_found = check_pages(rutracker_api, BOT)
+    if check_coordinator:
+        updates_found = check_coordinator.run(source=f"/check {user_id}")
+    else:
+        updates_found = check_pages(rutracker_api, BOT)
+    
+    # Следующие плановые проверки отсчитываются от только что выполненной
+    if check_scheduler:
+        check_scheduler.refresh()
+    if job_scheduler:
+        job_scheduler.wake()
     
     message = 'Проверка завершена. ' + ('Найдены обновления!' if updates_found else 'Обновлений не найдено.')
     update.message.reply_text(message, reply_markup=BACK_TO_LIST_KEYBOARD)
     
     logger.info(f"Завершена ручная проверка страниц пользователем {user_id}. Результат: {updates_found}")
 
+@admin_required_decorator
+def set_page_interval(update: Update, context: CallbackContext) -> None:
+    """
+    Задает границы интервала проверки страницы в минутах или возвращает общие настройки
+    """
+    user_id = update.effective_user.id
+    logger.debug(f"Команда /interval от пользователя {user_id}")
+    
+    usage = 'Использование: /interval <ID> <мин. минут> <макс. минут> или /interval <ID> reset'
+    if len(context.args) not in (2, 3) or (len(context.args) == 2 and context.args[1] != 'reset'):
+        update.message.reply_text(usage)
+        logger.warning(f"Неправильное использование команды /interval пользователем {user_id}")
+        return
+    
+    try:
+        page_id = int(context.args[0])
+        min_interval = max_interval = None
+        if len(context.args) == 3:
+            min_interval, max_interval = int(context.args[1]), int(context.args[2])
+            if min_interval < 1 or max_interval < min_interval:
+                update.message.reply_text('Интервал должен быть не меньше 1 минуты, максимум не меньше минимума.')
+                return
+    except ValueError:
+        update.message.reply_text(usage)
+        logger.warning(f"Некорректные аргументы команды /interval от {user_id}")
+        return
+    
+    if not update_page_interval(page_id, min_interval, max_interval):
+        update.message.reply_text(f'Страница с ID {page_id} не найдена.')
+        return
+    
+    if check_scheduler:
+        check_scheduler.refresh([page_id])
+    if job_scheduler:
+        job_scheduler.wake()
+    
+    if min_interval is None:
+        update.message.reply_text(f'Для страницы с ID {page_id} восстановлены общие границы интервала проверки.')
+    else:
+        update.message.reply_text(
+            f'Страница с ID {page_id} будет проверяться не чаще раза в {min_interval} и '
+            f'не реже раза в {max_interval} минут.'
+        )
+    logger.info(f"Команда /interval выполнена для страницы с ID {page_id} пользователем {user_id}")
+
 @admin_required_decorator
 def force_download(update: Update, context: CallbackContext) -> None:
     """
@@ -304,53 +350,72 @@ def force_download(update: Update, context: CallbackContext) -> None:
         return
     
     total_pages = len(pages)
-    success_count = 0
-    error_count = 0
     
     # Отправляем статусное сообщение
     status_msg = update.message.reply_text(f"Загрузка торрентов: 0/{total_pages}")
     
-    for idx, page in enumerate(pages, 1):
-        page_id, title, url, _, _ = page
+    def download_all(progress):
+        success_count = 0
+        error_count = 0
+        progress(0, total_pages)
         
-        try:
-            logger.debug(f"Принудительная загрузка страницы: {title} (ID: {page_id})")
-            
-            # Скачиваем торрент-файл
-            file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-            torrent_file_path = rutracker_api.download_torrent_by_url(url, file_path)
+        for idx, page in enumerate(pages, 1):
+            page_id, title, url, _, _ = page
             
-            if torrent_file_path:
-                # Отправляем торрент-файл в qBittorrent
-                qbit_result = upload_to_qbittorrent(torrent_file_path)
-                if qbit_result:
-                    logger.info(f"Торрент-файл для страницы {title} загружен и отправлен в qBittorrent")
-                    success_count += 1
+            try:
+                logger.debug(f"Принудительная загрузка страницы: {title} (ID: {page_id})")
+                
+                # Скачиваем торрент-файл, используя страницу из кэша, если она свежая;
+                # торрент, который уже есть в хранилище, повторно не скачивается
+                page_content = rutracker_api.get_page_content(url)
+                topic = rutracker_api.parse_topic(page_content) or {}
+                new_hash, torrent_file_path = get_torrent(
+                    rutracker_api, url, title, topic.get('info_hash'),
+                    page_content=page_content, download_link=topic.get('download_link')
+                )
+                
+                if torrent_file_path:
+                    update_page_info_hash(page_id, new_hash)
+                        
+                    # Отправляем торрент-файл в qBittorrent
+                    qbit_result = upload_to_qbittorrent(torrent_file_path)
+                    if qbit_result:
+                        logger.info(f"Торрент-файл для страницы {title} загружен и отправлен в qBittorrent")
+                        success_count += 1
+                    else:
+                        logger.warning(f"Торрент-файл загружен, но не отправлен в qBittorrent: {title}")
+                        error_count += 1
                 else:
-                    logger.warning(f"Торрент-файл загружен, но не отправлен в qBittorrent: {title}")
+                    logger.error(f"Не удалось загрузить торрент-файл для страницы {title}")
                     error_count += 1
-            else:
-                logger.error(f"Не удалось загрузить торрент-файл для страницы {title}")
-                error_count += 1
-                
-            # Обновляем время последней проверки
-            update_last_checked(page_id)
-            
-            # Обновляем статусное сообщение каждые несколько страниц или в конце
-            if idx % 5 == 0 or idx == total_pages:
-                try:
-                    context.bot.edit_message_text(
-                        chat_id=status_msg.chat_id,
-                        message_id=status_msg.message_id,
-                        text=f"Загрузка торрентов: {idx}/{total_pages}"
-                    )
-                except Exception:
-                    # Игнорируем ошибки редактирования сообщения
-                    pass
+                    
+                # Обновляем время последней проверки
+                update_last_checked(page_id)
+                progress(idx, total_pages)
                 
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке страницы {title}: {e}")
-            error_count += 1
+                # Обновляем статусное сообщение каждые несколько страниц или в конце
+                if idx % 5 == 0 or idx == total_pages:
+                    try:
+                        context.bot.edit_message_text(
+                            chat_id=status_msg.chat_id,
+                            message_id=status_msg.message_id,
+                            text=f"Загрузка торрентов: {idx}/{total_pages}"
+                        )
+                    except Exception:
+                        # Игнорируем ошибки редактирования сообщения
+                        pass
+                    
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке страницы {title}: {e}")
+                error_count += 1
+        
+        return success_count, error_count
+    
+    # Загрузка выполняется в очереди циклов проверки, чтобы не пересекаться с проверкой страниц
+    if check_coordinator:
+        success_count, error_count = check_coordinator.run(source="force", func=download_all)
+    else:
+        success_count, error_count = download_all(lambda done, total: None)
     
     # Отправляем итоговое сообщение
     result_message = (
@@ -363,6 +428,100 @@ def force_download(update: Update, context: CallbackContext) -> None:
     update.message.reply_text(result_message)
     logger.info(f"Принудительная загрузка завершена. Успешно: {success_count}, С ошибками: {error_count}")
 
+@admin_required_decorator
+def tracker_status(update: Update, context: CallbackContext) -> None:
+    """
+    Показывает состояние подключения к трекеру: выключатель запросов, лимиты и кэш
+    """
+    user_id = update.effective_user.id
+    logger.debug(f"Команда /tracker от пользователя {user_id}")
+    
+    breaker = rutracker_api.breaker_stats()
+    state_names = {'closed': 'работает', 'open': 'запросы приостановлены', 'half_open': 'пробный запрос'}
+    
+    status_text = "<b>Состояние трекера:</b>\n"
+    status_text += f"Статус: {html_value(state_names.get(breaker['state'], breaker['state']))}\n"
+    if breaker['retry_in']:
+        status_text += f"Повтор через: {html_value(breaker['retry_in'])} сек\n"
+    status_text += f"Ошибок в последних запросах: {html_value(breaker['recent_failures'])} из {html_value(breaker['recent_requests'])}\n"
+    status_text += f"Срабатываний: {html_value(breaker['trips'])}, пропущено запросов: {html_value(breaker['rejected'])}\n"
+    if breaker['last_error']:
+        status_text += f"Последняя ошибка: {html_value(breaker['last_error'])}\n"
+    
+    status_text += "\n<b>Ограничение запросов:</b>\n"
+    for limiter in rutracker_api.rate_limit_stats().values():
+        status_text += (f"{html_value(limiter['name'])}: {html_value(limiter['acquired'])} запросов, "
+                        f"среднее ожидание {html_value(limiter['avg_wait'])} сек, "
+                        f"максимальное {html_value(limiter['max_wait'])} сек\n")
+    
+    proxies = rutracker_api.proxy_stats()
+    if proxies:
+        status_text += "\n<b>Прокси:</b>\n"
+        for proxy in proxies:
+            latency = f"{html_value(proxy['latency'])} сек" if proxy['latency'] is not None else "нет данных"
+            status_text += (f"{html_value(proxy['name'])}: {'доступен' if proxy['healthy'] else 'недоступен'}, "
+                            f"задержка {latency}, ошибок {html_value(int(proxy['error_rate'] * 100))}%\n")
+    
+    cache = rutracker_api.cache_stats()
+    status_text += "\n<b>Кэш страниц:</b>\n"
+    status_text += (f"Записей: {html_value(cache['entries'])}, объем: {html_value(cache['bytes'] // 1024)} КБ\n"
+                    f"Попаданий: {html_value(cache['hits'])}, промахов: {html_value(cache['misses'])}, устаревших: {html_value(cache['stale'])}")
+    
+    flights = rutracker_api.coalesce_stats()
+    status_text += f"\nОбъединено одновременных запросов: {html_value(flights['shared'])} (выполнено {html_value(flights['leaders'])})"
+    
+    parse_pool = rutracker_api.parse_stats()
+    if parse_pool:
+        avg_time = f"{html_value(parse_pool['avg_time'])} сек" if parse_pool['avg_time'] is not None else "нет данных"
+        status_text += (f"\nРазбор страниц: {html_value(parse_pool['workers'])} процессов, разобрано {html_value(parse_pool['parsed'])}, "
+                        f"в среднем {avg_time}, без пула {html_value(parse_pool['fallbacks'])}")
+    
+    if check_scheduler:
+        schedule_stats = check_scheduler.stats()
+        status_text += "\n\n<b>Расписание проверок:</b>\n"
+        status_text += f"Страниц в очереди: {html_value(schedule_stats['pages'])}\n"
+        if schedule_stats['pages']:
+            status_text += (f"Интервалы: от {html_value(schedule_stats['min_interval'])} до {html_value(schedule_stats['max_interval'])} мин, "
+                            f"в среднем {html_value(schedule_stats['avg_interval'])} мин\n")
+        if schedule_stats['next_check_in'] is not None:
+            status_text += f"Следующая проверка через: {html_value(schedule_stats['next_check_in'])} сек\n"
+        if schedule_stats['deferred']:
+            status_text += f"Отложено до следующего цикла (сглаживание): {html_value(schedule_stats['deferred'])}\n"
+    
+    if job_scheduler:
+        loop = job_scheduler.stats()
+        status_text += f"Планировщик: {'работает' if loop['alive'] else 'ОСТАНОВЛЕН'}, пробуждений: {html_value(loop['wakeups'])}\n"
+        if loop['jitter_avg'] is not None:
+            status_text += (f"Опоздание запуска: в среднем {html_value(loop['jitter_avg'])} мс, "
+                            f"95% - {html_value(loop['jitter_p95'])} мс, максимум {html_value(loop['jitter_max'])} мс\n")
+    
+    if check_coordinator:
+        cycles = check_coordinator.status()
+        status_text += "\n<b>Циклы проверки:</b>\n"
+        if cycles['active']:
+            active = cycles['active']
+            status_text += f"Выполняется цикл {html_value(active['id'])} ({html_value(active['kind'])}): {html_value(format_cycle_progress(active))}\n"
+        else:
+            status_text += "Сейчас проверка не выполняется\n"
+        if cycles['queued']:
+            status_text += f"В очереди: {html_value(len(cycles['queued']))}\n"
+        if cycles['last']:
+            last = cycles['last']
+            status_text += f"Последний цикл {html_value(last['id'])} ({html_value(last['kind'])}): {html_value(last['elapsed'])} сек\n"
+        status_text += (f"Выполнено циклов: {html_value(cycles['cycles'])}, присоединено запросов: {html_value(cycles['joined'])}, "
+                        f"объединено в очереди: {html_value(cycles['merged'])}\n")
+    
+    if pipeline_stats:
+        status_text += "\n<b>Конвейер проверки:</b>\n"
+        for stage in (stats.snapshot() for stats in list(pipeline_stats.values())):
+            avg_time = f"{html_value(stage['avg_time'])} сек" if stage['avg_time'] is not None else "нет данных"
+            status_text += (f"{html_value(stage['name'])} ({html_value(stage['workers'])} потоков): обработано {html_value(stage['processed'])}, "
+                            f"ошибок {html_value(stage['errors'])}, в среднем {avg_time}, "
+                            f"до {html_value(stage['throughput'] or '-')} в сек, очередь {html_value(stage['depth'])} (макс. {html_value(stage['max_depth'])})\n")
+    
+    update.message.reply_text(status_text, parse_mode='HTML')
+    logger.info(f"Состояние трекера отображено для администратора {user_id}")
+
 @admin_required_decorator
 def clean_files_dir(update: Update, context: CallbackContext) -> None:
     """
@@ -385,12 +544,16 @@ def clean_files_dir(update: Update, context: CallbackContext) -> None:
         return
     
     try:
-        # Удаляем все файлы .torrent из FILE_DIR
+        # Удаляем все файлы .torrent из FILE_DIR и временные файлы прерванных записей;
+        # недавние временные файлы не трогаем: их может дописывать текущая проверка
         file_count = 0
+        now = time.time()
         for filename in os.listdir(FILE_DIR):
-            if filename.endswith(".torrent"):
+            if filename.endswith((".torrent", ".part")):
                 file_path = os.path.join(FILE_DIR, filename)
                 try:
+                    if filename.endswith(".part") and now - os.path.getmtime(file_path) < STALE_PART_AGE:
+                        continue
                     os.remove(file_path)
                     file_count += 1
                     logger.debug(f"Удален файл: {file_path}")
@@ -667,27 +830,18 @@ def delete_all_pages(update: Update, context: CallbackContext) -> None:
         
         # Удаляем страницы и их файлы
         for page in pages:
-            page_id, title, _, _, _ = page
-            
-            # Удаляем соответствующий торрент-файл, если он существует
-            file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    deleted_files += 1
-                    logger.debug(f"Удален файл: {file_path}")
-                except Exception as e:
-                    logger.error(f"Не удалось удалить файл {file_path}: {e}")
+            page_id, title, url, _, _ = page
             
-            # Удаляем страницу из базы данных
-            delete_page(page_id)
+            # Удаляем страницу из базы данных вместе с ее торрент-файлами и из кэша
+            deleted_files += delete_page(page_id)
+            rutracker_api.invalidate_page(url)
             deleted_pages += 1
             logger.debug(f"Удалена страница: {title} (ID: {page_id})")
         
         result_message = (
             f"Операция завершена.\n"
             f"Удалено страниц: {deleted_pages} из {total_pages}\n"
-            f"Удалено файлов: {deleted_files} из {total_pages}"
+            f"Удалено файлов: {deleted_files}"
         )
         
         update.message.reply_text(result_message)
@@ -717,6 +871,7 @@ def admin_help_cmd(update: Update, context: CallbackContext) -> None:
     help_text += "<b>Команды администратора:</b>\n"
     help_text += "/update [ID] [ссылка] - Обновить ссылку для страницы\n"
     help_text += "/check - Запустить проверку обновлений вручную\n"
+    help_text += "/interval [ID] [мин] [макс] - Границы интервала проверки страницы (reset - сбросить)\n"
     help_text += "/users - Показать список всех пользователей\n"
     help_text += "/adduser [ID] [is_admin=0] [sub=1] - Добавить пользователя\n"
     help_text += "/userdel [ID] - Удалить пользователя\n"
@@ -725,6 +880,7 @@ def admin_help_cmd(update: Update, context: CallbackContext) -> None:
     help_text += "/help - Показать этот список команд\n"
     help_text += "/force - Принудительная загрузка всех страниц\n"
     help_text += "/clean - Очистить директорию с торрент-файлами\n"
+    help_text += "/tracker - Состояние подключения к трекеру\n"
     help_text += "/dellall - Удалить ВСЕ отслеживаемые страницы и их файлы\n"
 
     help_text += "<b>Параметры:</b>\n"
@@ -831,7 +987,10 @@ def button(update: Update, context: CallbackContext) -> None:
     elif action == 'delete':
         page_id = int(parts[1])
         logger.debug(f"Запрос на удаление страницы с ID {page_id} от пользователя {user_id}")
+        page = get_page_by_id(page_id)
         delete_page(page_id)
+        if page:
+            rutracker_api.invalidate_page(page[2])
         query.edit_message_text(text=f'Страница с ID {page_id} удалена', reply_markup=BACK_TO_LIST_KEYBOARD)
         logger.info(f"Страница с ID {page_id} удалена пользователем {user_id}")
 
@@ -841,14 +1000,20 @@ def button(update: Update, context: CallbackContext) -> None:
         page = get_page_by_id(page_id)
         if page:
             page_id, title, url, _, _ = page
-            edit_date = rutracker_api.get_edit_date(url)
+            page_content = rutracker_api.get_page_content(url, refresh=True, head_ok=True)
+            topic = rutracker_api.parse_topic(page_content) or {}
+            edit_date = topic.get('date')
             update_last_checked(page_id)
             
-            # Скачиваем торрент-файл
-            file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-            downloaded_file = rutracker_api.download_torrent_by_url(url, file_path)
+            # Скачиваем торрент-файл по уже полученной странице, если его нет в хранилище
+            new_hash, downloaded_file = get_torrent(
+                rutracker_api, url, title, topic.get('info_hash'),
+                page_content=page_content, download_link=topic.get('download_link')
+            )
             
             if downloaded_file:
+                update_page_info_hash(page_id, new_hash)
+                    
                 # Отправляем торрент-файл в qBittorrent
                 qbit_result = upload_to_qbittorrent(downloaded_file)
                 
@@ -879,43 +1044,8 @@ def handle_text(update: Update, context: CallbackContext) -> None:
         logger.debug(f"Получена ссылка от пользователя {user_id}")
         
         try:
-            title = rutracker_api.get_page_title(url)
-            logger.debug(f"Получен заголовок: {title}")
-            
-            page_id, title, existing_id = add_page(title, url, rutracker_api)
-            
-            if page_id is None:
-                # Страница уже существует
-                update.message.reply_text(
-                    f'Эта ссылка уже добавлена в мониторинг под названием "{title}" (ID: {existing_id}).',
-                    reply_markup=ADD_MORE_KEYBOARD
-                )
-                logger.info(f"Попытка добавить дубликат URL пользователем {user_id}")
-            else:
-                update.message.reply_text(
-                    f'Ссылку поймал и добавил в мониторинг.',
-                    reply_markup=ADD_MORE_KEYBOARD
-                )
-                logger.debug("Отправлено подтверждение добавления")
-                logger.info(f"Страница {title} добавлена для мониторинга через сообщение пользователем {user_id}")
-                
-                # Скачиваем торрент-файл
-                file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-                downloaded_file = rutracker_api.download_torrent_by_url(url, file_path)
-                
-                if downloaded_file:
-                    # Отправляем торрент-файл в qBittorrent
-                    qbit_result = upload_to_qbittorrent(downloaded_file)
-                    
-                    if qbit_result:
-                        update.message.reply_text(f"Торрент-файл скачан и отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                        logger.info(f"Торрент-файл для страницы {title} отправлен в qBittorrent")
-                    else:
-                        update.message.reply_text(f"Торрент-файл скачан, но не отправлен в qBittorrent: {os.path.basename(downloaded_file)}")
-                        logger.warning(f"Не удалось отправить торрент-файл для страницы {title} в qBittorrent")
-                else:
-                    update.message.reply_text("Не удалось скачать торрент-файл.")
-                    logger.error(f"Ошибка при скачивании торрент-файла для страницы {title}")
+            result = add_topic(url, rutracker_api)
+            reply_add_result(update, result, 'Ссылку поймал и добавил в мониторинг.')
             
             context.bot_data[waiting_key] = False
             logger.debug(f"Сброшен флаг ожидания URL для чата {chat_id}")
@@ -926,8 +1056,11 @@ def handle_text(update: Update, context: CallbackContext) -> None:
             context.bot_data[waiting_key] = False
 
 # Функция для установки внешних зависимостей
-def set_dependencies(api, bot):
-    global rutracker_api, BOT
+def set_dependencies(api, bot, scheduler=None, jobs=None, coordinator=None):
+    global rutracker_api, BOT, check_scheduler, job_scheduler, check_coordinator
     rutracker_api = api
     BOT = bot
-    logger.debug("Установлены внешние зависимости (rutracker_api и BOT)")
+    check_scheduler = scheduler
+    job_scheduler = jobs
+    check_coordinator = coordinator
+    logger.debug("Установлены внешние зависимости (rutracker_api, BOT, планировщик и координатор проверок)")
@@ -0,0 +1,408 @@
+import asyncio
+import logging
+import threading
+import requests
+import aiohttp
+from requests.cookies import RequestsCookieJar
+from topic_parser import PageHeadReader
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401 (нужен httpx для HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_REQUESTS = "requests"
+TRANSPORT_HTTPX = "httpx"
+
+
+def resolve_transport(name):
+    """
+    Проверяет, что выбранный транспорт доступен
+
+    Args:
+        name (str): Имя транспорта (requests или httpx)
+
+    Returns:
+        str: Имя транспорта, который будет использоваться
+    """
+    name = (name or TRANSPORT_REQUESTS).lower()
+    if name == TRANSPORT_HTTPX:
+        if httpx is None:
+            logger.error("Транспорт httpx выбран, но пакет httpx не установлен, используется requests")
+            return TRANSPORT_REQUESTS
+        if not HTTP2_AVAILABLE:
+            logger.warning("Пакет h2 не установлен, httpx будет работать по HTTP/1.1")
+        return TRANSPORT_HTTPX
+    if name != TRANSPORT_REQUESTS:
+        logger.error(f"Неизвестный транспорт {name}, используется requests")
+    return TRANSPORT_REQUESTS
+
+
+def transport_errors(transport):
+    """
+    Возвращает исключения транспорта, означающие сетевой сбой запроса
+
+    Args:
+        transport (str): Имя транспорта
+
+    Returns:
+        tuple: Классы исключений
+    """
+    if transport == TRANSPORT_HTTPX:
+        return (httpx.TransportError,)
+    return (requests.RequestException,)
+
+
+def httpx_limits(pool_size, keepalive_expiry):
+    """
+    Параметры пула соединений httpx
+
+    Args:
+        pool_size (int): Максимальное число соединений
+        keepalive_expiry (float): Время жизни простаивающего соединения в секундах
+
+    Returns:
+        httpx.Limits: Ограничения пула
+    """
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_expiry
+    )
+
+
+def httpx_mounts(transport_class, proxies, limits):
+    """
+    Транспорты httpx для схем http и https с прокси из настроек
+
+    Args:
+        transport_class: httpx.HTTPTransport или httpx.AsyncHTTPTransport
+        proxies (dict): Прокси в формате requests ({'http': url, 'https': url})
+        limits (httpx.Limits): Ограничения пула
+
+    Returns:
+        dict or None: Транспорты по схемам или None, если прокси не используются
+    """
+    if not proxies:
+        return None
+    return {
+        f"{scheme}://": transport_class(http2=HTTP2_AVAILABLE, limits=limits, proxy=proxy)
+        for scheme, proxy in proxies.items() if proxy
+    }
+
+
+def proxy_key(proxies):
+    """
+    Ключ набора прокси для кэша клиентов httpx
+
+    Args:
+        proxies (dict): Прокси в формате requests или None
+
+    Returns:
+        tuple or None: Неизменяемое представление набора прокси
+    """
+    return tuple(sorted(proxies.items())) if proxies else None
+
+
+class HttpxResponse:
+    """
+    Ответ httpx с интерфейсом ответа requests, который использует RutrackerAPI
+    """
+    def __init__(self, response):
+        self._response = response
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        # Потоковый ответ httpx нужно дочитать явно, requests делает это сам
+        self._response.read()
+        return self._response.text
+
+    def json(self, **kwargs):
+        self._response.read()
+        return self._response.json(**kwargs)
+
+    def iter_content(self, chunk_size=None):
+        return self._response.iter_bytes(chunk_size)
+
+
+class HttpxSession:
+    """
+    Синхронная сессия поверх пула соединений httpx (HTTP/2, keep-alive, сжатие)
+    с интерфейсом requests.Session в объеме, который использует RutrackerAPI.
+    httpx задает прокси на уровне клиента, поэтому для каждого прокси создается
+    свой клиент; cookie у всех клиентов общие и хранятся в RequestsCookieJar,
+    поэтому сохранение и восстановление сессии работают одинаково для обоих транспортов
+    """
+    def __init__(self, pool_size=10, keepalive_expiry=30):
+        """
+        Args:
+            pool_size (int): Максимальное число соединений одного клиента
+            keepalive_expiry (float): Время жизни простаивающего соединения в секундах
+        """
+        self.cookies = RequestsCookieJar()
+        self.limits = httpx_limits(pool_size, keepalive_expiry)
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client_for(self, proxies):
+        """
+        Возвращает клиент httpx для набора прокси, создавая его при первом обращении
+
+        Args:
+            proxies (dict): Прокси в формате requests или None
+
+        Returns:
+            httpx.Client: Клиент
+        """
+        key = proxy_key(proxies)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    limits=self.limits,
+                    mounts=httpx_mounts(httpx.HTTPTransport, proxies, self.limits),
+                    cookies=self.cookies,
+                    follow_redirects=True
+                )
+                self._clients[key] = client
+            return client
+
+    def get(self, url, params=None, headers=None, proxies=None, stream=False, timeout=None):
+        """
+        Выполняет GET-запрос
+        """
+        client = self.client_for(proxies)
+        if stream:
+            request = client.build_request('GET', url, params=params, headers=headers, timeout=timeout)
+            return HttpxResponse(client.send(request, stream=True))
+        return HttpxResponse(client.get(url, params=params, headers=headers, timeout=timeout))
+
+    def post(self, url, data=None, headers=None, proxies=None, timeout=None):
+        """
+        Выполняет POST-запрос с данными формы
+        """
+        return HttpxResponse(self.client_for(proxies).post(url, data=data, headers=headers, timeout=timeout))
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+def create_session(transport, pool_size=10, keepalive_expiry=30):
+    """
+    Создает синхронную сессию выбранного транспорта
+
+    Args:
+        transport (str): Имя транспорта
+        pool_size (int): Максимальное число соединений (только httpx)
+        keepalive_expiry (float): Время жизни простаивающего соединения (только httpx)
+
+    Returns:
+        requests.Session or HttpxSession: Сессия
+    """
+    if transport == TRANSPORT_HTTPX:
+        return HttpxSession(pool_size, keepalive_expiry)
+    return requests.Session()
+
+
+class AiohttpFetcher:
+    """
+    Асинхронное получение страниц через пул соединений aiohttp
+    """
+    def __init__(self, cookies, pool_size, timeout, decoder,
+                 chunk_size, max_head_bytes, keepalive_expiry=30, session_generation=0, raw_heads=False):
+        """
+        Args:
+            cookies (dict): Cookie авторизации
+            pool_size (int): Максимальное число соединений
+            timeout (float): Таймаут запроса в секундах
+            decoder (PageDecoder): Декодирование страниц в известной кодировке
+            chunk_size (int): Размер блока при потоковом чтении
+            max_head_bytes (int): Предел чтения начала страницы
+            keepalive_expiry (float): Время жизни простаивающего соединения в секундах
+            session_generation (int): Поколение сессии, которой принадлежат cookie
+            raw_heads (bool): Возвращать начало страницы байтами без декодирования
+        """
+        self.session_generation = session_generation
+        self.raw_heads = raw_heads
+        self.errors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self.decoder = decoder
+        self.chunk_size = chunk_size
+        self.max_head_bytes = max_head_bytes
+        self.client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=keepalive_expiry),
+            cookies=cookies,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+
+    async def fetch(self, url, headers, head_only=False, proxies=None):
+        """
+        Выполняет GET-запрос
+
+        Args:
+            url (str): URL страницы
+            headers (dict): Заголовки запроса
+            head_only (bool): Читать страницу только до ссылки на торрент
+            proxies (dict): Прокси в формате requests
+
+        Returns:
+            tuple: (status, headers, content); headers без учета регистра,
+                   content равен None, если статус не 200, и байтами для начала страницы при raw_heads
+        """
+        proxy = (proxies.get('https') or proxies.get('http')) if proxies else None
+        async with self.client.get(url, headers=headers, proxy=proxy) as response:
+            if response.status != 200:
+                return response.status, response.headers, None
+
+            content_type = response.headers.get('Content-Type')
+            if head_only:
+                reader = None
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    if reader is None:
+                        encoding = self.decoder.encoding_for(url, content_type, chunk)
+                        reader = PageHeadReader(encoding, self.max_head_bytes)
+                    if reader.feed(chunk):
+                        break
+                content = reader.finish(self.raw_heads) if reader else (b'' if self.raw_heads else '')
+            else:
+                content = self.decoder.decode(url, content_type, await response.read())
+            return response.status, response.headers, content
+
+    def update_cookies(self, cookies, session_generation):
+        self.client.cookie_jar.update_cookies(cookies)
+        self.session_generation = session_generation
+
+    async def close(self):
+        await self.client.close()
+
+
+class HttpxFetcher:
+    """
+    Асинхронное получение страниц через пул соединений httpx: по HTTP/2
+    запросы мультиплексируются в одном соединении. Для каждого прокси
+    создается свой клиент с общими cookie
+    """
+    def __init__(self, cookies, pool_size, timeout, decoder,
+                 chunk_size, max_head_bytes, keepalive_expiry=30, session_generation=0, raw_heads=False):
+        """
+        Args:
+            cookies (dict): Cookie авторизации
+            pool_size (int): Максимальное число соединений
+            timeout (float): Таймаут запроса в секундах
+            decoder (PageDecoder): Декодирование страниц в известной кодировке
+            chunk_size (int): Размер блока при потоковом чтении
+            max_head_bytes (int): Предел чтения начала страницы
+            keepalive_expiry (float): Время жизни простаивающего соединения в секундах
+            session_generation (int): Поколение сессии, которой принадлежат cookie
+            raw_heads (bool): Возвращать начало страницы байтами без декодирования
+        """
+        self.session_generation = session_generation
+        self.raw_heads = raw_heads
+        self.errors = (httpx.TransportError,)
+        self.decoder = decoder
+        self.chunk_size = chunk_size
+        self.max_head_bytes = max_head_bytes
+        self.timeout = timeout
+        self.limits = httpx_limits(pool_size, keepalive_expiry)
+        self.cookies = httpx.Cookies(cookies)
+        self._clients = {}
+
+    def client_for(self, proxies):
+        """
+        Возвращает клиент httpx для набора прокси, создавая его при первом обращении
+
+        Args:
+            proxies (dict): Прокси в формате requests или None
+
+        Returns:
+            httpx.AsyncClient: Клиент
+        """
+        key = proxy_key(proxies)
+        client = self._clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self.limits,
+                mounts=httpx_mounts(httpx.AsyncHTTPTransport, proxies, self.limits),
+                cookies=self.cookies.jar,
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+            self._clients[key] = client
+        return client
+
+    async def fetch(self, url, headers, head_only=False, proxies=None):
+        """
+        Выполняет GET-запрос
+
+        Args:
+            url (str): URL страницы
+            headers (dict): Заголовки запроса
+            head_only (bool): Читать страницу только до ссылки на торрент
+            proxies (dict): Прокси в формате requests
+
+        Returns:
+            tuple: (status, headers, content); headers без учета регистра,
+                   content равен None, если статус не 200, и байтами для начала страницы при raw_heads
+        """
+        async with self.client_for(proxies).stream('GET', url, headers=headers) as response:
+            if response.status_code != 200:
+                return response.status_code, response.headers, None
+
+            content_type = response.headers.get('Content-Type')
+            if head_only:
+                reader = None
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    if reader is None:
+                        encoding = self.decoder.encoding_for(url, content_type, chunk)
+                        reader = PageHeadReader(encoding, self.max_head_bytes)
+                    if reader.feed(chunk):
+                        break
+                content = reader.finish(self.raw_heads) if reader else (b'' if self.raw_heads else '')
+            else:
+                content = self.decoder.decode(url, content_type, await response.aread())
+            return response.status_code, response.headers, content
+
+    def update_cookies(self, cookies, session_generation):
+        self.cookies.update(cookies)
+        self.session_generation = session_generation
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+
+def create_fetcher(transport, **kwargs):
+    """
+    Создает асинхронный загрузчик страниц выбранного транспорта.
+    Вызывается внутри работающего цикла событий
+
+    Args:
+        transport (str): Имя транспорта
+        **kwargs: Параметры конструктора загрузчика
+
+    Returns:
+        AiohttpFetcher or HttpxFetcher: Загрузчик
+    """
+    if transport == TRANSPORT_HTTPX:
+        return HttpxFetcher(**kwargs)
+    return AiohttpFetcher(**kwargs)
@@ -0,0 +1,217 @@
+import time
+import heapq
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    Задача планировщика: функция и правило вычисления времени следующего запуска
+    """
+    def __init__(self, name, func, next_delay):
+        """
+        Args:
+            name (str): Имя задачи
+            func (callable): Функция без аргументов
+            next_delay (callable): Функция без аргументов, возвращающая задержку
+                                   до следующего запуска в секундах (None - не запускать)
+        """
+        self.name = name
+        self.func = func
+        self.next_delay = next_delay
+        self.deadline = None
+        self.runs = 0
+        self.errors = 0
+        self.last_run = None
+        self.last_duration = None
+
+
+class JobScheduler:
+    """
+    Планировщик задач на куче сроков и условной переменной: поток спит ровно
+    до ближайшего срока и не просыпается без необходимости. Сроки можно
+    пересчитать или запустить задачу досрочно из других потоков
+    """
+    def __init__(self, jitter_window=100):
+        """
+        Args:
+            jitter_window (int): Количество последних запусков для статистики опозданий
+        """
+        self.jobs = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._recompute = False
+        self.jitter = deque(maxlen=jitter_window)
+        self.wakeups = 0
+        self.last_heartbeat = None
+        self.started_at = None
+
+    def add_job(self, name, func, next_delay, run_now=False):
+        """
+        Добавляет задачу
+
+        Args:
+            name (str): Имя задачи
+            func (callable): Функция без аргументов
+            next_delay (callable): Задержка до следующего запуска в секундах
+            run_now (bool): Запустить задачу сразу после старта планировщика
+        """
+        job = Job(name, func, next_delay)
+        with self._cond:
+            self.jobs[name] = job
+            self._schedule(job, 0 if run_now else None)
+            self._cond.notify()
+
+    def _schedule(self, job, delay=None):
+        """
+        Назначает срок задачи (вызывается под блокировкой). Устаревшие записи
+        кучи не удаляются, а пропускаются при извлечении
+        """
+        if delay is None:
+            try:
+                delay = job.next_delay()
+            except Exception as e:
+                logger.error(f"Ошибка при расчете следующего запуска задачи {job.name}: {e}", exc_info=True)
+                delay = 60
+        if delay is None:
+            job.deadline = None
+            return
+        job.deadline = time.monotonic() + max(0, delay)
+        heapq.heappush(self._heap, (job.deadline, job.name))
+
+    def run_now(self, name):
+        """
+        Запускает задачу досрочно
+
+        Args:
+            name (str): Имя задачи
+        """
+        with self._cond:
+            job = self.jobs.get(name)
+            if job is None:
+                return
+            self._schedule(job, 0)
+            self._cond.notify()
+
+    def wake(self):
+        """
+        Пересчитывает сроки всех задач (например, после изменения расписания страниц)
+        """
+        with self._cond:
+            self._recompute = True
+            self._cond.notify()
+
+    def start(self):
+        """
+        Запускает поток планировщика
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Останавливает поток планировщика после завершения текущей задачи
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        """
+        Returns:
+            bool: True, если поток планировщика работает
+        """
+        return bool(self._thread and self._thread.is_alive())
+
+    def _next_job(self):
+        """
+        Ждет наступления ближайшего срока и возвращает задачу (None при остановке)
+        """
+        with self._cond:
+            while not self._stopping:
+                self.wakeups += 1
+                self.last_heartbeat = time.time()
+                if self._recompute:
+                    self._recompute = False
+                    for job in self.jobs.values():
+                        self._schedule(job)
+
+                # Пропускаем записи, срок которых был пересчитан
+                while self._heap and self.jobs[self._heap[0][1]].deadline != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                if timeout is not None and timeout <= 0:
+                    deadline, name = heapq.heappop(self._heap)
+                    job = self.jobs[name]
+                    job.deadline = None
+                    self.jitter.append(time.monotonic() - deadline)
+                    return job
+                self._cond.wait(timeout)
+        return None
+
+    def _run(self):
+        logger.debug("Поток планировщика задач запущен")
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+
+                started = time.monotonic()
+                try:
+                    job.func()
+                except Exception as e:
+                    job.errors += 1
+                    logger.error(f"Ошибка при выполнении задачи {job.name}: {e}", exc_info=True)
+                job.runs += 1
+                job.last_run = time.time()
+                job.last_duration = time.monotonic() - started
+
+                with self._cond:
+                    # Задача могла быть запущена досрочно во время выполнения
+                    if job.deadline is None:
+                        self._schedule(job)
+        except BaseException as e:
+            logger.critical(f"Поток планировщика задач остановлен из-за ошибки: {e}", exc_info=True)
+            raise
+        logger.info("Поток планировщика задач остановлен")
+
+    def stats(self):
+        """
+        Returns:
+            dict: Состояние потока, время с последнего пробуждения, число пробуждений,
+                  опоздания запусков относительно срока в миллисекундах и данные задач
+        """
+        with self._cond:
+            jitter = sorted(self.jitter)
+            now = time.monotonic()
+            jobs = {
+                name: {
+                    "runs": job.runs,
+                    "errors": job.errors,
+                    "last_duration": round(job.last_duration, 1) if job.last_duration is not None else None,
+                    "next_run_in": max(0, round(job.deadline - now)) if job.deadline is not None else None,
+                }
+                for name, job in self.jobs.items()
+            }
+            return {
+                "alive": self.is_alive(),
+                "idle_for": round(time.time() - self.last_heartbeat) if self.last_heartbeat else None,
+                "wakeups": self.wakeups,
+                "jitter_avg": round(sum(jitter) / len(jitter) * 1000, 1) if jitter else None,
+                "jitter_p95": round(jitter[int(len(jitter) * 0.95)] * 1000, 1) if jitter else None,
+                "jitter_max": round(jitter[-1] * 1000, 1) if jitter else None,
+                "jobs": jobs,
+            }
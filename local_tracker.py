@@ -0,0 +1,336 @@
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+LOGIN_FORM = b'<html><form action="login.php" method="post"><input name="login_username"></form></html>'
+MONTHS = ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн', 'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек']
+
+
+class LocalTopic:
+    """
+    Раздача локального трекера: версия раздачи меняет дату редактирования,
+    info-hash и торрент-файл
+    """
+    def __init__(self, topic_id):
+        self.topic_id = str(topic_id)
+        self.version = 0
+        self.fail_downloads = 0
+
+    @property
+    def date(self):
+        # Каждая версия - следующая минута: 01-Янв-24 00:00, 01-Янв-24 00:01, ...
+        return f"01-{MONTHS[0]}-24 {self.version // 60 % 24:02d}:{self.version % 60:02d}"
+
+    @property
+    def info(self):
+        name = f"topic-{self.topic_id}-v{self.version}".encode()
+        return b"d6:lengthi1024e4:name" + str(len(name)).encode() + b":" + name + b"e"
+
+    @property
+    def torrent(self):
+        return b"d8:announce16:http://localhost4:info" + self.info + b"e"
+
+    @property
+    def info_hash(self):
+        return hashlib.sha1(self.info).hexdigest().upper()
+
+    def page(self):
+        return (
+            f"<html><head><title>Раздача {self.topic_id} / локальный трекер</title></head><body>"
+            f"<a href=\"login.php?logout=1\">logout</a>"
+            f"<span class=\"posted_since hide-for-print\">ред. {self.date}</span>"
+            f"<a href=\"magnet:?xt=urn:btih:{self.info_hash}\">magnet</a>"
+            f"<span class=\"tor-icon tor-approved\"></span>"
+            f"<a class=\"dl-stub\" href=\"dl.php?t={self.topic_id}\">скачать</a>"
+            f"</body></html>"
+        ).encode('windows-1251')
+
+
+class LocalTracker:
+    """
+    Локальная замена трекера для проверки клиента без обращения к rutracker.org:
+    вход с сессиями, которые можно сбросить, страницы раздач с ETag и ответом 304,
+    скачивание торрент-файлов и пакетный API get_tor_topic_data. Запускается в отдельном потоке
+    """
+    def __init__(self, host='127.0.0.1', port=0, delay=0):
+        """
+        Args:
+            host (str): Адрес сервера
+            port (int): Порт (0 - любой свободный)
+            delay (float): Задержка каждого ответа в секундах
+        """
+        self.topics = {}
+        self.sessions = set()
+        self.logins = 0
+        self.delay = delay
+        self.requests = {}
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/forum/"
+
+    @property
+    def api_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def topic(self, topic_id):
+        """
+        Возвращает раздачу, создавая ее при первом обращении
+
+        Args:
+            topic_id (int or str): Идентификатор раздачи
+
+        Returns:
+            LocalTopic: Раздача
+        """
+        with self._lock:
+            return self.topics.setdefault(str(topic_id), LocalTopic(topic_id))
+
+    def topic_url(self, topic_id):
+        self.topic(topic_id)
+        return f"{self.base_url}viewtopic.php?t={topic_id}"
+
+    def update_topic(self, topic_id, fail_downloads=0):
+        """
+        Публикует новую версию раздачи
+
+        Args:
+            topic_id (int or str): Идентификатор раздачи
+            fail_downloads (int): Сколько следующих скачиваний торрента завершить ошибкой 500
+        """
+        topic = self.topic(topic_id)
+        with self._lock:
+            topic.version += 1
+            topic.fail_downloads = fail_downloads
+
+    def expire_sessions(self):
+        """
+        Сбрасывает все сессии: следующие запросы получат форму входа
+        """
+        with self._lock:
+            self.sessions.clear()
+
+    def count(self, path):
+        with self._lock:
+            return self.requests.get(path, 0)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _handler(self):
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                self._serve()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                self._serve()
+
+            def _serve(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                with tracker._lock:
+                    tracker.requests[parts.path] = tracker.requests.get(parts.path, 0) + 1
+                    tracker.active += 1
+                    tracker.max_active = max(tracker.max_active, tracker.active)
+                try:
+                    if tracker.delay:
+                        time.sleep(tracker.delay)
+                    self._route(parts.path, query)
+                finally:
+                    with tracker._lock:
+                        tracker.active -= 1
+
+            def _logged_in(self):
+                cookie = SimpleCookie(self.headers.get('Cookie') or '').get('bb_session')
+                with tracker._lock:
+                    return cookie is not None and cookie.value in tracker.sessions
+
+            def _route(self, path, query):
+                if path == '/forum/login.php':
+                    with tracker._lock:
+                        tracker.logins += 1
+                        session = f"s{tracker.logins}"
+                        tracker.sessions.add(session)
+                    self._reply(200, b'<html><a href="login.php?logout=1">logout</a></html>',
+                                'text/html; charset=windows-1251', {'Set-Cookie': f'bb_session={session}; Path=/'})
+                elif path.startswith('/forum/') and not self._logged_in():
+                    self._reply(200, LOGIN_FORM, 'text/html; charset=windows-1251')
+                elif path == '/forum/viewtopic.php' and query.get('t') in tracker.topics:
+                    topic = tracker.topics[query['t']]
+                    etag = f'"{topic.topic_id}-{topic.version}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self._reply(304, b'', None, {'ETag': etag})
+                    else:
+                        self._reply(200, topic.page(), 'text/html; charset=windows-1251', {'ETag': etag})
+                elif path == '/forum/dl.php' and query.get('t') in tracker.topics:
+                    topic = tracker.topics[query['t']]
+                    with tracker._lock:
+                        failed = topic.fail_downloads > 0
+                        topic.fail_downloads -= failed
+                    if failed:
+                        self._reply(500, b'error', 'text/plain')
+                    else:
+                        self._reply(200, topic.torrent, 'application/x-bittorrent')
+                elif path == '/v1/get_tor_topic_data':
+                    result = {}
+                    for topic_id in query.get('val', '').split(','):
+                        topic = tracker.topics.get(topic_id)
+                        result[topic_id] = {
+                            'info_hash': topic.info_hash, 'reg_time': 1700000000 + topic.version,
+                        } if topic else None
+                    self._reply(200, json.dumps({'result': result}).encode(), 'application/json')
+                else:
+                    self._reply(404, b'not found', 'text/plain')
+
+            def _reply(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+def local_api(tracker, **kwargs):
+    """
+    Создает клиент трекера, направленный на локальный трекер
+
+    Args:
+        tracker (LocalTracker): Запущенный локальный трекер
+        **kwargs: Дополнительные параметры RutrackerAPI
+
+    Returns:
+        RutrackerAPI: Клиент
+    """
+    from rutracker_api import RutrackerAPI
+    kwargs.setdefault('page_rate', 1000)
+    kwargs.setdefault('page_burst', 1000)
+    kwargs.setdefault('download_rate', 1000)
+    kwargs.setdefault('download_burst', 1000)
+    api = RutrackerAPI('local', 'local', api_url=tracker.api_url, **kwargs)
+    api.base_url = tracker.base_url
+    return api
+
+
+def check_failed_download(tracker):
+    """
+    Обновление раздачи, торрент которой не удалось скачать, должно быть
+    обнаружено повторно при следующей проверке (порядок действий check_pages)
+
+    Returns:
+        bool: True, если проверка пройдена
+    """
+    api = local_api(tracker)
+    url = tracker.topic_url(1)
+    api.mark_topic_checked(url, api.get_changed_topics([url])[url])
+    api.get_pages_if_modified([url])
+
+    tracker.update_topic(1, fail_downloads=1)
+    changed = api.get_changed_topics([url])
+    modified, page_content = api.get_pages_if_modified([url])[url]
+    topic = api.parse_topic(page_content)
+    if url not in changed or not modified or api.download_torrent(url, download_link=topic['download_link']):
+        return False
+    # Скачивание не удалось: состояние раздачи не запоминается, валидаторы сбрасываются
+    api.forget_validators(url)
+
+    modified, page_content = api.get_pages_if_modified([url])[url]
+    passed = url in api.get_changed_topics([url]) and modified and bool(page_content)
+    api.close()
+    return passed
+
+
+def check_concurrent_relogin(tracker, threads=32, topics=40):
+    """
+    Много одновременных запросов из потоков бота и асинхронной пакетной загрузки
+    после сброса сессии на трекере: повторный вход должен выполнить один поток,
+    а все запросы - получить страницы авторизованного пользователя
+
+    Returns:
+        bool: True, если проверка пройдена
+    """
+    api = local_api(tracker, fetch_concurrency=threads)
+    urls = [tracker.topic_url(topic_id) for topic_id in range(1, topics + 1)]
+    api.get_page_content(urls[0])
+    logins = tracker.logins
+
+    tracker.expire_sessions()
+    tracker.delay = 0.02
+
+    def fetch(index):
+        url = urls[index % len(urls)]
+        if index % 4 == 0:
+            return api.download_torrent(url, download_link=f"{tracker.base_url}dl.php?t={index % len(urls) + 1}")
+        return api.get_page_content(url, refresh=True)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pages = executor.submit(api.fetch_pages, urls)
+        results = list(executor.map(fetch, range(threads * 4)))
+        pages = pages.result()
+    elapsed = time.monotonic() - started
+    api.close()
+
+    relogins = tracker.logins - logins
+    failed = sum(1 for result in results if not result) + sum(1 for page in pages.values() if not page['content'])
+    print(f"{len(results) + len(pages)} запросов за {elapsed:.2f} сек, одновременно до {tracker.max_active}, "
+          f"повторных входов: {relogins}, ошибок: {failed}")
+    return relogins == 1 and failed == 0
+
+
+if __name__ == '__main__':
+    # python local_tracker.py - проверки клиента трекера на локальном трекере,
+    # в том числе нагрузочная проверка повторного входа из многих потоков
+    logging.basicConfig(level=logging.WARNING)
+    # Пул соединений requests меньше числа потоков нагрузочной проверки: предупреждения о нем не нужны
+    logging.getLogger('urllib3').setLevel(logging.ERROR)
+    checks = [check_failed_download, check_concurrent_relogin]
+    failed = 0
+    for check in checks:
+        with LocalTracker() as local_tracker:
+            passed = check(local_tracker)
+        failed += not passed
+        print(f"{check.__name__}: {'OK' if passed else 'ОШИБКА'}")
+    sys.exit(1 if failed else 0)
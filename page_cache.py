@@ -0,0 +1,159 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """
+    Запись кэша страниц
+    """
+    __slots__ = ("content", "size", "stored_at")
+
+    def __init__(self, content, size, stored_at):
+        self.content = content
+        self.size = size
+        self.stored_at = stored_at
+
+
+class PageCache:
+    """
+    Потокобезопасный кэш HTML-страниц с ограничением по времени жизни и объему
+    """
+    def __init__(self, ttl=300, max_entries=128, max_bytes=32 * 1024 * 1024):
+        """
+        Инициализирует кэш
+
+        Args:
+            ttl (float): Время жизни записи в секундах
+            max_entries (int): Максимальное количество записей
+            max_bytes (int): Максимальный суммарный объем записей в байтах
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(content):
+        """
+        Оценивает размер содержимого в байтах
+        """
+        if isinstance(content, (bytes, bytearray)):
+            return len(content)
+        return len(content.encode("utf-8", errors="ignore"))
+
+    def get(self, url, max_age=None):
+        """
+        Возвращает содержимое страницы из кэша, если запись свежая
+
+        Args:
+            url (str): URL страницы
+            max_age (float): Допустимый возраст записи (по умолчанию ttl)
+
+        Returns:
+            str or None: Содержимое страницы или None
+        """
+        if max_age is None:
+            max_age = self.ttl
+
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.monotonic() - entry.stored_at > max_age:
+                self.stale += 1
+                return None
+
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry.content
+
+    def put(self, url, content):
+        """
+        Сохраняет содержимое страницы в кэш
+
+        Args:
+            url (str): URL страницы
+            content (str): HTML-код страницы
+        """
+        if content is None:
+            return
+
+        size = self._sizeof(content)
+        if size > self.max_bytes:
+            logger.debug(f"Страница {url} слишком велика для кэша ({size} байт)")
+            self.invalidate(url)
+            return
+
+        with self._lock:
+            old_entry = self._entries.pop(url, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry.size
+
+            self._entries[url] = CacheEntry(content, size, time.monotonic())
+            self.total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        """
+        Удаляет самые старые записи, пока кэш не уложится в ограничения
+        """
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.evictions += 1
+
+    def invalidate(self, url):
+        """
+        Удаляет запись для указанного URL
+
+        Args:
+            url (str): URL страницы
+
+        Returns:
+            bool: True, если запись была удалена
+        """
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is None:
+                return False
+            self.total_bytes -= entry.size
+            return True
+
+    def clear(self):
+        """
+        Очищает кэш
+        """
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """
+        Возвращает статистику работы кэша
+
+        Returns:
+            dict: Счетчики попаданий, промахов, устаревших записей и объем
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,178 @@
+import re
+import sys
+import time
+import codecs
+import logging
+import threading
+from urllib.parse import urlsplit
+from requests import Response
+
+logger = logging.getLogger(__name__)
+
+# Кодировка из заголовка Content-Type и из мета-тега страницы
+CONTENT_TYPE_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+# Мета-тег с кодировкой находится в начале <head>
+META_SNIFF_BYTES = 4096
+
+
+def normalize_encoding(name):
+    """
+    Проверяет, что кодировка известна Python, и приводит ее имя к каноническому
+
+    Args:
+        name (str): Имя кодировки
+
+    Returns:
+        str or None: Каноническое имя или None, если кодировка неизвестна
+    """
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        logger.debug(f"Неизвестная кодировка: {name}")
+        return None
+
+
+def charset_from_content_type(content_type):
+    """
+    Извлекает кодировку из заголовка Content-Type
+
+    Args:
+        content_type (str): Значение заголовка
+
+    Returns:
+        str or None: Кодировка или None
+    """
+    match = CONTENT_TYPE_CHARSET_RE.search(content_type or '')
+    return normalize_encoding(match.group(1)) if match else None
+
+
+def charset_from_meta(head):
+    """
+    Извлекает кодировку из мета-тега в начале страницы
+
+    Args:
+        head (bytes): Начало страницы
+
+    Returns:
+        str or None: Кодировка или None
+    """
+    match = META_CHARSET_RE.search(head[:META_SNIFF_BYTES])
+    return normalize_encoding(match.group(1).decode('ascii', errors='ignore')) if match else None
+
+
+class PageDecoder:
+    """
+    Декодирование страниц из байтов в известной кодировке: из заголовка ответа,
+    из мета-тега или из запомненной для хоста, без угадывания кодировки по всему телу
+    """
+    def __init__(self, default_encoding='windows-1251'):
+        """
+        Args:
+            default_encoding (str): Кодировка, если ее не удалось определить
+        """
+        self.default_encoding = default_encoding
+        self.host_encodings = {}
+        self._lock = threading.Lock()
+
+    def encoding_for(self, url, content_type=None, head=b''):
+        """
+        Определяет кодировку страницы и запоминает ее для хоста
+
+        Args:
+            url (str): URL страницы
+            content_type (str): Заголовок Content-Type ответа
+            head (bytes): Начало страницы (для поиска мета-тега)
+
+        Returns:
+            str: Кодировка
+        """
+        host = urlsplit(str(url)).hostname
+        encoding = charset_from_content_type(content_type)
+        if encoding is None:
+            with self._lock:
+                encoding = self.host_encodings.get(host)
+            if encoding is not None:
+                return encoding
+            encoding = charset_from_meta(head)
+            if encoding is None:
+                return self.default_encoding
+
+        with self._lock:
+            if self.host_encodings.get(host) != encoding:
+                logger.debug(f"Кодировка страниц {host}: {encoding}")
+                self.host_encodings[host] = encoding
+        return encoding
+
+    def decode(self, url, content_type, body):
+        """
+        Декодирует тело ответа
+
+        Args:
+            url (str): URL страницы
+            content_type (str): Заголовок Content-Type ответа
+            body (bytes): Тело ответа
+
+        Returns:
+            str: Текст страницы
+        """
+        return body.decode(self.encoding_for(url, content_type, body), errors='replace')
+
+
+def benchmark(body, runs=10, content_type='text/html; charset=windows-1251'):
+    """
+    Сравнивает время декодирования страницы с кодировкой из заголовка Content-Type,
+    из мета-тега и с угадыванием кодировки по всему телу (apparent_encoding в requests)
+
+    Args:
+        body (bytes): Тело страницы
+        runs (int): Сколько раз декодировать страницу каждым способом
+        content_type (str): Заголовок Content-Type для замера по заголовку
+
+    Returns:
+        list: [(способ, кодировка, миллисекунд на страницу)]
+    """
+    url = 'https://rutracker.org/forum/viewtopic.php?t=1'
+
+    def decode_header():
+        decoder = PageDecoder()
+        return decoder.encoding_for(url, content_type, body), decoder.decode(url, content_type, body)
+
+    def decode_meta():
+        # Новый декодер на каждый повтор: кодировка хоста еще не запомнена
+        decoder = PageDecoder()
+        return decoder.encoding_for(url, None, body), decoder.decode(url, None, body)
+
+    def decode_apparent():
+        response = Response()
+        response._content = body
+        encoding = response.apparent_encoding
+        return encoding, body.decode(encoding or 'utf-8', errors='replace')
+
+    results = []
+    for name, decode in (('Content-Type', decode_header), ('мета-тег', decode_meta),
+                         ('apparent_encoding', decode_apparent)):
+        started = time.perf_counter()
+        for _ in range(runs):
+            encoding, _ = decode()
+        results.append((name, encoding, (time.perf_counter() - started) / runs * 1000))
+    return results
+
+
+if __name__ == '__main__':
+    # python page_decoder.py page.html [runs] - сравнение с apparent_encoding на сохраненной странице раздачи
+    if len(sys.argv) < 2:
+        print("Использование: python page_decoder.py <файл страницы> [число повторов]")
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        content = f.read()
+    total_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"Размер страницы: {len(content) // 1024} КБ, повторов: {total_runs}")
+    timings = benchmark(content, total_runs)
+    for name, encoding, ms in timings:
+        print(f"{name} ({encoding}): {ms:.2f} мс")
+    fast = timings[0][2]
+    print(f"Ускорение относительно apparent_encoding: в {timings[-1][2] / fast:.0f} раз")
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import logging
+import threading
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from topic_parser import extract_topic
+
+logger = logging.getLogger(__name__)
+
+
+class ParsePool:
+    """
+    Разбор страниц раздач в пуле процессов: страницы передаются процессам,
+    обратно возвращаются только извлеченные поля (заголовок, дата, ссылка,
+    info-hash, статус). Разбор не удерживает GIL основного процесса, поэтому
+    не замедляет обработчики бота при проверке большого списка страниц
+    """
+    def __init__(self, workers, encoding='windows-1251'):
+        """
+        Args:
+            workers (int): Число процессов
+            encoding (str): Кодировка страниц, переданных байтами
+        """
+        self.workers = workers
+        self.encoding = encoding
+        self._executor = None
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.fallbacks = 0
+        self.busy = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn вместо fork: в процессе бота работают потоки, и копия их блокировок
+                # в дочернем процессе может остаться захваченной навсегда
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Запущен пул разбора страниц: {self.workers} процессов")
+            return self._executor
+
+    def _reset(self, error):
+        logger.error(f"Пул разбора страниц недоступен, страницы разбираются в основном процессе: {error}")
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, count, started, fallback=False):
+        with self._lock:
+            self.parsed += count
+            self.busy += time.monotonic() - started
+            if fallback:
+                self.fallbacks += count
+
+    def extract(self, page_content, encoding=None):
+        """
+        Разбирает одну страницу в пуле процессов. Страницу лучше передавать байтами:
+        декодирование тогда тоже выполняется в процессе пула
+
+        Args:
+            page_content (str or bytes): HTML-код страницы
+            encoding (str): Кодировка страницы, переданной байтами (по умолчанию кодировка пула)
+
+        Returns:
+            dict: Поля страницы в формате topic_parser.extract_topic
+        """
+        encoding = encoding or self.encoding
+        started = time.monotonic()
+        try:
+            topic = self._get_executor().submit(extract_topic, page_content, encoding).result()
+        except BrokenProcessPool as e:
+            self._reset(e)
+            topic = extract_topic(page_content, encoding)
+            self._record(1, started, fallback=True)
+            return topic
+        self._record(1, started)
+        return topic
+
+    def extract_many(self, pages):
+        """
+        Разбирает несколько страниц, распределяя их между процессами
+
+        Args:
+            pages (list): HTML-код страниц
+
+        Returns:
+            list: Поля страниц в том же порядке
+        """
+        if not pages:
+            return []
+        started = time.monotonic()
+        chunksize = max(1, len(pages) // (self.workers * 4))
+        try:
+            topics = list(self._get_executor().map(
+                extract_topic, pages, repeat(self.encoding), chunksize=chunksize
+            ))
+        except BrokenProcessPool as e:
+            self._reset(e)
+            topics = [extract_topic(page_content, self.encoding) for page_content in pages]
+            self._record(len(pages), started, fallback=True)
+            return topics
+        self._record(len(pages), started)
+        return topics
+
+    def close(self):
+        """
+        Останавливает процессы пула
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Число процессов, разобранных страниц, разобранных без пула и среднее время
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "parsed": self.parsed,
+                "fallbacks": self.fallbacks,
+                "avg_time": round(self.busy / self.parsed, 4) if self.parsed else None,
+            }
+
+
+def benchmark(page_content, pages=400, worker_counts=None):
+    """
+    Сравнивает скорость разбора страниц в основном процессе и в пулах разного размера
+
+    Args:
+        page_content (str or bytes): HTML-код страницы для разбора
+        pages (int): Сколько раз разобрать страницу
+        worker_counts (list): Размеры пулов (по умолчанию 1, 2, 4, ... до числа ядер)
+
+    Returns:
+        list: [(процессов, страниц в секунду)], 0 процессов - разбор без пула
+    """
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu_count:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cpu_count:
+            worker_counts.append(cpu_count)
+
+    batch = [page_content] * pages
+    started = time.monotonic()
+    for item in batch:
+        extract_topic(item)
+    results = [(0, pages / (time.monotonic() - started))]
+
+    for workers in worker_counts:
+        pool = ParsePool(workers)
+        # Первый вызов запускает процессы: время запуска в замер не входит
+        pool.extract_many(batch[:workers * 4])
+        started = time.monotonic()
+        pool.extract_many(batch)
+        results.append((workers, pages / (time.monotonic() - started)))
+        pool.close()
+    return results
+
+
+if __name__ == '__main__':
+    # python parse_pool.py page.html [pages] - замер скорости разбора на сохраненной странице раздачи
+    if len(sys.argv) < 2:
+        print("Использование: python parse_pool.py <файл страницы> [число страниц]")
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        content = f.read()
+    total_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    print(f"Ядер: {os.cpu_count()}, размер страницы: {len(content) // 1024} КБ, страниц: {total_pages}")
+    for workers, rate in benchmark(content, total_pages):
+        label = f"{workers} процессов" if workers else "без пула"
+        print(f"{label}: {rate:.0f} страниц/сек")
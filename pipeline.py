@@ -0,0 +1,177 @@
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Сигнал завершения для рабочих потоков этапа
+_STOP = object()
+
+
+class StageStats:
+    """
+    Накопленная статистика этапа конвейера
+    """
+    def __init__(self, name):
+        self.name = name
+        self.workers = 1
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, duration, error=False):
+        with self._lock:
+            self.processed += 1
+            self.busy += duration
+            if error:
+                self.errors += 1
+
+    def observe_depth(self, depth):
+        with self._lock:
+            self.depth = depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Обработано, ошибок, среднее время элемента, пропускная способность
+                  этапа (элементов в секунду при всех занятых потоках) и глубина очереди
+        """
+        with self._lock:
+            avg_time = self.busy / self.processed if self.processed else None
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "avg_time": round(avg_time, 3) if avg_time is not None else None,
+                "throughput": round(self.workers / avg_time, 2) if avg_time else None,
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+            }
+
+
+class Stage:
+    """
+    Этап конвейера: функция обработки, свой пул потоков и ограниченная входная очередь
+    """
+    def __init__(self, name, func, workers=1, queue_size=0):
+        """
+        Args:
+            name (str): Имя этапа
+            func (callable): func(item) возвращает элемент для следующего этапа,
+                             список элементов или None, если обработка элемента завершена
+            workers (int): Число рабочих потоков
+            queue_size (int): Размер входной очереди (0 - без ограничения)
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+
+
+class Pipeline:
+    """
+    Конвейер из этапов с отдельными пулами потоков. Очереди между этапами
+    ограничены, поэтому медленный этап притормаживает предыдущие, а не копит
+    элементы в памяти; при этом этапы, ожидающие сети, выполняются одновременно
+    """
+    def __init__(self, stages, on_done=None, stats=None):
+        """
+        Args:
+            stages (list): Этапы Stage в порядке обработки
+            on_done (callable): on_done(item) - вызывается, когда обработка элемента
+                                завершена (на любом этапе, в том числе с ошибкой)
+            stats (dict): Словарь {имя этапа: StageStats} для накопления статистики между запусками
+        """
+        self.stages = stages
+        self.on_done = on_done
+        self.stats = stats if stats is not None else {}
+        for stage in stages:
+            self.stats.setdefault(stage.name, StageStats(stage.name)).workers = stage.workers
+
+    def start(self):
+        """
+        Запускает рабочие потоки всех этапов
+        """
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(index,), name=f"{stage.name}-{number + 1}", daemon=True
+                )
+                thread.start()
+                stage.threads.append(thread)
+
+    def submit(self, item):
+        """
+        Передает элемент на первый этап (блокируется, если очередь этапа заполнена)
+        """
+        self._put(0, item)
+
+    def _put(self, index, item):
+        stage = self.stages[index]
+        stage.queue.put(item)
+        self.stats[stage.name].observe_depth(stage.queue.qsize())
+
+    def _finish(self, item):
+        if self.on_done is None:
+            return
+        for finished in item if isinstance(item, list) else [item]:
+            try:
+                self.on_done(finished)
+            except Exception as e:
+                logger.error(f"Ошибка при завершении обработки элемента конвейера: {e}", exc_info=True)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                break
+            stats.observe_depth(stage.queue.qsize())
+
+            started = time.monotonic()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                stats.record(time.monotonic() - started, error=True)
+                logger.error(f"Ошибка на этапе {stage.name}: {e}", exc_info=True)
+                self._finish(item)
+                continue
+            stats.record(time.monotonic() - started)
+
+            if result is None:
+                self._finish(item)
+            elif is_last:
+                self._finish(result)
+            else:
+                for next_item in result if isinstance(result, list) else [result]:
+                    self._put(index + 1, next_item)
+
+    def close(self):
+        """
+        Дожидается обработки всех переданных элементов и останавливает потоки.
+        Этапы останавливаются по порядку, чтобы элементы успели пройти весь конвейер
+        """
+        for stage in self.stages:
+            for _ in stage.threads:
+                stage.queue.put(_STOP)
+            for thread in stage.threads:
+                thread.join()
+            stage.threads = []
+            self.stats[stage.name].observe_depth(0)
+
+    def snapshot(self):
+        """
+        Returns:
+            list: Статистика этапов в порядке обработки
+        """
+        return [self.stats[stage.name].snapshot() for stage in self.stages]
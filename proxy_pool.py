@@ -0,0 +1,221 @@
+import time
+import random
+import logging
+import threading
+import requests
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyState:
+    """
+    Состояние одного прокси: задержка, последние результаты запросов и доступность
+    """
+    def __init__(self, proxies, window_size=20):
+        """
+        Args:
+            proxies (dict): Прокси в формате requests ({'http': url, 'https': url})
+            window_size (int): Количество последних запросов для оценки доли ошибок
+        """
+        self.proxies = proxies
+        # Имя для логов и статистики без логина и пароля прокси
+        proxy_url = urlsplit(proxies.get('https') or proxies.get('http'))
+        self.name = f"{proxy_url.scheme}://{proxy_url.hostname}"
+        if proxy_url.port:
+            self.name += f":{proxy_url.port}"
+        self.latency = None
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.outcomes = deque(maxlen=window_size)
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+    def error_rate(self):
+        """
+        Returns:
+            float: Доля ошибок в последних запросах
+        """
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ProxyPool:
+    """
+    Пул прокси-серверов. Фоновый поток периодически проверяет прокси,
+    для каждого отслеживаются задержка (скользящее среднее) и доля ошибок.
+    Запросы распределяются между доступными прокси с весом, обратным задержке,
+    поэтому быстрые прокси получают больше запросов, а упавший прокси
+    исключается после нескольких ошибок подряд до успешной проверки
+    """
+    def __init__(self, proxy_list, check_url, check_interval=300, check_timeout=5,
+                 max_failures=3, latency_smoothing=0.3):
+        """
+        Args:
+            proxy_list (list): Прокси в формате requests ({'http': url, 'https': url})
+            check_url (str): URL для проверки прокси
+            check_interval (float): Интервал фоновой проверки в секундах
+            check_timeout (float): Таймаут проверки в секундах
+            max_failures (int): Число ошибок подряд, после которого прокси исключается
+            latency_smoothing (float): Вес нового замера в скользящем среднем задержки
+        """
+        self.entries = [ProxyState(proxies) for proxies in proxy_list]
+        self.check_url = check_url
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_failures = max_failures
+        self.latency_smoothing = latency_smoothing
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def choose(self, exclude=()):
+        """
+        Выбирает прокси для запроса
+
+        Args:
+            exclude (tuple): Прокси, которые уже не сработали для этого запроса
+
+        Returns:
+            ProxyState or None: Выбранный прокси или None, если выбирать не из чего
+        """
+        with self._lock:
+            candidates = [entry for entry in self.entries if entry not in exclude]
+            if not candidates:
+                return None
+
+            healthy = [entry for entry in candidates if entry.healthy]
+            if not healthy:
+                # Все прокси недоступны: пробуем тот, что ошибался реже остальных
+                return min(candidates, key=lambda entry: (entry.consecutive_failures, entry.error_rate()))
+
+            # Прокси без замеров получают вес самого медленного, чтобы их задержка была измерена
+            known = [entry.latency for entry in healthy if entry.latency]
+            default_latency = max(known) if known else 1.0
+            weights = [
+                (1 - entry.error_rate() / 2) / max(entry.latency or default_latency, 0.001)
+                for entry in healthy
+            ]
+            return random.choices(healthy, weights=weights)[0]
+
+    def record_success(self, entry, latency):
+        """
+        Учитывает успешный запрос через прокси
+
+        Args:
+            entry (ProxyState): Прокси
+            latency (float): Время ответа в секундах
+        """
+        with self._lock:
+            if entry.latency is None:
+                entry.latency = latency
+            else:
+                entry.latency += self.latency_smoothing * (latency - entry.latency)
+            entry.outcomes.append(True)
+            entry.requests += 1
+            entry.consecutive_failures = 0
+            if not entry.healthy:
+                logger.info(f"Прокси {entry.name} снова доступен")
+                entry.healthy = True
+
+    def record_failure(self, entry, error=None):
+        """
+        Учитывает ошибку соединения через прокси
+
+        Args:
+            entry (ProxyState): Прокси
+            error (str): Описание ошибки
+        """
+        with self._lock:
+            entry.outcomes.append(False)
+            entry.requests += 1
+            entry.failures += 1
+            entry.consecutive_failures += 1
+            entry.last_error = error
+            if entry.healthy and entry.consecutive_failures >= self.max_failures:
+                logger.warning(f"Прокси {entry.name} исключен из пула: {error}")
+                entry.healthy = False
+
+    def check(self, entry):
+        """
+        Проверяет прокси запросом к check_url
+
+        Args:
+            entry (ProxyState): Прокси
+
+        Returns:
+            bool: True, если прокси работает
+        """
+        started = time.monotonic()
+        try:
+            response = requests.get(self.check_url, proxies=entry.proxies, timeout=self.check_timeout)
+            response.close()
+        except Exception as e:
+            logger.error(f"Ошибка при проверке прокси {entry.name}: {e}")
+            self.record_failure(entry, str(e))
+            # Проверка надежнее отдельных запросов: неответивший прокси исключается сразу
+            with self._lock:
+                entry.healthy = False
+            return False
+
+        self.record_success(entry, time.monotonic() - started)
+        return True
+
+    def check_all(self):
+        """
+        Проверяет все прокси пула
+
+        Returns:
+            int: Количество доступных прокси
+        """
+        return sum(self.check(entry) for entry in self.entries)
+
+    def start(self):
+        """
+        Запускает фоновую проверку прокси
+        """
+        if self._thread or not self.check_interval:
+            return
+        self._thread = threading.Thread(target=self._run, name="proxy-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает фоновую проверку прокси
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.check_timeout + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            healthy_count = self.check_all()
+            logger.debug(f"Проверка прокси: доступно {healthy_count} из {len(self.entries)}")
+
+    def stats(self):
+        """
+        Возвращает состояние прокси пула
+
+        Returns:
+            list: Словари с задержкой, долей ошибок и доступностью каждого прокси
+        """
+        with self._lock:
+            return [
+                {
+                    "name": entry.name,
+                    "healthy": entry.healthy,
+                    "latency": round(entry.latency, 3) if entry.latency is not None else None,
+                    "error_rate": round(entry.error_rate(), 2),
+                    "requests": entry.requests,
+                    "failures": entry.failures,
+                    "last_error": entry.last_error,
+                }
+                for entry in self.entries
+            ]
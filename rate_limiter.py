@@ -0,0 +1,104 @@
+import time
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов по алгоритму token bucket.
+    Один объект используется и синхронным кодом, и корутинами asyncio.
+    Каждый вызов резервирует токен заранее, поэтому ожидающие обслуживаются
+    в порядке обращения и не могут вместе превысить лимит
+    """
+    def __init__(self, rate, burst=1, name="requests"):
+        """
+        Инициализирует ограничитель
+
+        Args:
+            rate (float): Скорость пополнения (токенов в секунду)
+            burst (int): Максимальный запас токенов (допустимый всплеск запросов)
+            name (str): Имя ограничителя для логов и статистики
+        """
+        if rate <= 0:
+            raise ValueError("Скорость ограничителя должна быть положительной")
+
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.name = name
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self):
+        """
+        Резервирует токен и возвращает время ожидания до его доступности
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # Запас может уйти в минус: это очередь уже зарезервированных запросов
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.acquired += 1
+            if wait_time > 0:
+                self.delayed += 1
+                self.total_wait += wait_time
+                self.max_wait = max(self.max_wait, wait_time)
+            return wait_time
+
+    def acquire(self):
+        """
+        Ожидает токен (синхронно)
+
+        Returns:
+            float: Фактическое время ожидания в секундах
+        """
+        wait_time = self.reserve()
+        if wait_time > 0:
+            logger.debug(f"Ограничение запросов ({self.name}): ожидание {wait_time:.2f} сек")
+            time.sleep(wait_time)
+        return wait_time
+
+    async def acquire_async(self):
+        """
+        Ожидает токен (асинхронно)
+
+        Returns:
+            float: Фактическое время ожидания в секундах
+        """
+        wait_time = self.reserve()
+        if wait_time > 0:
+            logger.debug(f"Ограничение запросов ({self.name}): ожидание {wait_time:.2f} сек")
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+    def stats(self):
+        """
+        Возвращает статистику ожидания
+
+        Returns:
+            dict: Параметры ограничителя и метрики времени ожидания
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "rate": self.rate,
+                "burst": self.burst,
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "total_wait": round(self.total_wait, 3),
+                "avg_wait": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "max_wait": round(self.max_wait, 3),
+            }
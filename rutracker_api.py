@@ -1,21 +1,55 @@
 import os
-import requests
+import json
+import hashlib
 import re
 import logging
 import time
 import asyncio
-import aiohttp
-import functools
-from bs4 import BeautifulSoup
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from contextlib import contextmanager
+from page_cache import PageCache
+from rate_limiter import TokenBucket
+from circuit_breaker import CircuitBreaker, parse_retry_after
+from topic_parser import extract_topic, extract_topic_soup
+from http_transport import resolve_transport, transport_errors, create_session, create_fetcher
+from proxy_pool import ProxyPool
+from singleflight import SingleFlight
+from page_decoder import PageDecoder
+from parse_pool import ParsePool
 
 logger = logging.getLogger(__name__)
 
+# Идентификатор раздачи в ссылке вида viewtopic.php?t=12345
+TOPIC_ID_RE = re.compile(r'[?&]t=(\d+)')
+
+
+def normalize_url(url):
+    """
+    Приводит URL к каноническому виду для объединения одинаковых запросов:
+    схема и хост в нижнем регистре, параметры отсортированы, без фрагмента
+
+    Args:
+        url (str): URL страницы
+
+    Returns:
+        str: Нормализованный URL
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
 class RutrackerAPI:
     """
     Класс для взаимодействия с API RuTracker
     """
-    def __init__(self, username, password, cache_size=128, request_timeout=30):
+    def __init__(self, username, password, cache_size=128, request_timeout=30,
+                 cache_ttl=300, cache_max_bytes=32 * 1024 * 1024, fetch_concurrency=4,
+                 page_rate=1.0, page_burst=1, download_rate=0.5, download_burst=2,
+                 cookie_file=None, bulk_check=True, api_url="https://api.rutracker.cc/v1/",
+                 transport="requests", keepalive_expiry=30, proxy_list=None,
+                 proxy_check_interval=300, proxy_check_url="https://rutracker.org/robots.txt",
+                 parse_workers=0):
         """
         Инициализирует сессию и параметры для работы с RuTracker
         
@@ -24,116 +58,525 @@ class RutrackerAPI:
             password (str): Пароль для авторизации
             cache_size (int): Размер кэша для результатов запросов
             request_timeout (int): Таймаут запросов в секундах
+            cache_ttl (float): Время жизни записи кэша в секундах
+            cache_max_bytes (int): Максимальный объем кэша в байтах
+            fetch_concurrency (int): Максимальное число одновременных запросов
+                при пакетной загрузке страниц
+            page_rate (float): Допустимая частота запросов страниц (в секунду)
+            page_burst (int): Допустимый всплеск запросов страниц
+            download_rate (float): Допустимая частота скачиваний dl.php (в секунду)
+            download_burst (int): Допустимый всплеск скачиваний dl.php
+            cookie_file (str): Файл для сохранения cookie сессии между перезапусками
+            bulk_check (bool): Предварительно проверять изменения раздач пакетным API
+            api_url (str): Базовый URL API трекера
+            transport (str): HTTP-клиент: requests или httpx (пул соединений с HTTP/2)
+            keepalive_expiry (float): Время жизни простаивающего соединения в пуле httpx
+            proxy_list (list): Адреса прокси для пула (по умолчанию пара HTTP_PROXY/HTTPS_PROXY)
+            proxy_check_interval (float): Интервал фоновой проверки прокси в секундах
+            proxy_check_url (str): URL для проверки прокси
+            parse_workers (int): Число процессов для разбора страниц (0 - разбор в основном процессе)
         """
         self.username = username
         self.password = password
-        self.session = requests.Session()
         self.base_url = "https://rutracker.org/forum/"
         self.logged_in = False
-        self.proxies = self.setup_proxies()
+        self.session_expires = None
+        self.session_expiry_margin = 60  # Обновляем сессию заранее (в секундах)
+        # Сессия общая для потока планировщика и обработчиков бота:
+        # повторный вход выполняет только один поток, остальные ждут результата
+        self.session_lock = threading.Lock()
+        self.session_generation = 0
+        # Замененные сессии: [(время замены, сессия)]. Закрываются не сразу, а когда
+        # начатые на них запросы гарантированно завершились
+        self.retired_sessions = []
+        self.last_login_failure = 0
+        self.login_retry_interval = 30  # Пауза после неудачной авторизации (в секундах)
+        self.proxy_failover_attempts = 3  # Сколько прокси пробовать для одного запроса
+        self.proxy_pool = self.setup_proxies(proxy_list, proxy_check_interval, proxy_check_url)
         self.request_timeout = request_timeout
-        self.last_request_time = 0
-        self.request_interval = 1.0  # Минимальный интервал между запросами (в секундах)
+        self.fetch_concurrency = fetch_concurrency
+        self.default_encoding = 'windows-1251'
+        # Страницы декодируются из байтов в известной кодировке без угадывания по телу ответа
+        self.decoder = PageDecoder(self.default_encoding)
+        # Разбор страниц в пуле процессов не удерживает GIL основного процесса
+        self.parse_pool = ParsePool(parse_workers, self.default_encoding) if parse_workers > 0 else None
+        
+        # HTTP-клиент для запросов к трекеру
+        self.transport = resolve_transport(transport)
+        self.transport_errors = transport_errors(self.transport)
+        self.keepalive_expiry = keepalive_expiry
+        self.session = self.create_session()
+        logger.info(f"HTTP-клиент для запросов к трекеру: {self.transport}")
+        # Ограничители частоты запросов, общие для синхронного и асинхронного кода:
+        # страницы и скачивание торрент-файлов учитываются раздельно
+        self.page_limiter = TokenBucket(page_rate, page_burst, name="pages")
+        self.download_limiter = TokenBucket(download_rate, download_burst, name="downloads")
+        
+        # Выключатель запросов при массовых ошибках трекера
+        self.breaker = CircuitBreaker()
+        
+        # Пакетная проверка раздач через API трекера: {topic_id: (info_hash, reg_time)}
+        self.bulk_check_enabled = bulk_check
+        self.api_url = api_url
+        self.bulk_batch_size = 100  # Максимум идентификаторов в одном запросе API
+        self.topic_signatures = {}
+        
+        # Восстанавливаем сессию, сохраненную при прошлом запуске
+        self.cookie_file = cookie_file
+        self.load_cookies()
         
         # Стандартные заголовки для запросов
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         
-        # Декорируем метод get_page_content для кэширования
-        self.get_page_content = functools.lru_cache(maxsize=cache_size)(self.get_page_content)
+        # Кэш страниц с ограничением по времени жизни и объему
+        self.page_cache = PageCache(
+            ttl=cache_ttl,
+            max_entries=cache_size,
+            max_bytes=cache_max_bytes
+        )
+        
+        # Объединение одновременных запросов одной и той же страницы
+        self.flights = SingleFlight()
+        
+        # Валидаторы страниц для условных запросов: {url: {'etag', 'last_modified', 'hash'}}
+        self.page_validators = {}
+        
+        # Параметры потокового чтения начала страницы при проверке обновлений
+        self.stream_chunk_size = 16 * 1024
+        self.stream_max_bytes = 512 * 1024
 
-    def setup_proxies(self):
+    def setup_proxies(self, proxy_list=None, check_interval=300, check_url="https://rutracker.org/robots.txt"):
         """
-        Настраивает и проверяет прокси-серверы, если они указаны в переменных окружения
+        Настраивает пул прокси-серверов, если использование прокси включено,
+        проверяет их и запускает фоновую проверку
+        
+        Args:
+            proxy_list (list): Адреса прокси; если не заданы, используется пара
+                HTTP_PROXY/HTTPS_PROXY из переменных окружения
+            check_interval (float): Интервал фоновой проверки в секундах
+            check_url (str): URL для проверки прокси
         
         Returns:
-            dict or None: Словарь с настройками прокси или None
+            ProxyPool or None: Пул прокси или None
         """
         if os.getenv('USE_PROXY', 'false').lower() == 'true':
-            http_proxy = os.getenv('HTTP_PROXY')
-            https_proxy = os.getenv('HTTPS_PROXY')
-            
-            if not http_proxy or not https_proxy:
-                logger.error("Не настроены прокси-серверы")
-                return None
+            if proxy_list:
+                entries = [{"http": proxy, "https": proxy} for proxy in proxy_list]
+            else:
+                http_proxy = os.getenv('HTTP_PROXY')
+                https_proxy = os.getenv('HTTPS_PROXY')
                 
-            proxies = {
-                "http": http_proxy,
-                "https": https_proxy
-            }
+                if not http_proxy or not https_proxy:
+                    logger.error("Не настроены прокси-серверы")
+                    return None
+                    
+                entries = [{"http": http_proxy, "https": https_proxy}]
             
-            if not all(self.validate_proxy(proxy) for proxy in proxies.values()):
-                logger.error("Некорректные настройки прокси")
-                return None
-                
-            logger.info("Использование прокси настроено успешно")
-            return proxies
+            proxy_pool = ProxyPool(entries, check_url, check_interval)
+            healthy_count = proxy_pool.check_all()
+            if healthy_count:
+                logger.info(f"Использование прокси настроено успешно: доступно {healthy_count} из {len(proxy_pool)}")
+            else:
+                logger.error("Ни один прокси не прошел проверку, запросы будут повторять попытки через все прокси")
+            proxy_pool.start()
+            return proxy_pool
             
         return None
 
-    def validate_proxy(self, proxy_url):
+    def send_request(self, session, method, url, **kwargs):
         """
-        Проверяет работоспособность прокси
+        Выполняет запрос через прокси из пула. При ошибке соединения прокси
+        помечается как сбойный и запрос повторяется через другой прокси
         
         Args:
-            proxy_url (str): URL прокси-сервера
+            session: Сессия requests или httpx
+            method (str): Метод сессии ('get' или 'post')
+            url (str): URL запроса
+            **kwargs: Параметры запроса
             
         Returns:
-            bool: True если прокси работает, иначе False
+            Response: Ответ сервера
+            
+        Raises:
+            Исключение транспорта, если запрос не удался ни через один прокси
         """
-        try:
-            requests.get("http://httpbin.org/ip", proxies={"http": proxy_url}, timeout=5)
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при проверке прокси {proxy_url}: {e}")
-            return False
+        if not self.proxy_pool:
+            return getattr(session, method)(url, timeout=self.request_timeout, **kwargs)
+            
+        tried = []
+        while True:
+            proxy = self.proxy_pool.choose(exclude=tried)
+            started = time.monotonic()
+            try:
+                response = getattr(session, method)(
+                    url, proxies=proxy.proxies, timeout=self.request_timeout, **kwargs
+                )
+            except self.transport_errors as e:
+                self.proxy_pool.record_failure(proxy, str(e))
+                tried.append(proxy)
+                if len(tried) >= min(self.proxy_failover_attempts, len(self.proxy_pool)):
+                    raise
+                logger.warning(f"Ошибка соединения через прокси {proxy.name}, повтор через другой прокси")
+                continue
+                
+            self.proxy_pool.record_success(proxy, time.monotonic() - started)
+            return response
+
+    async def send_request_async(self, fetcher, url, headers, head_only):
+        """
+        Асинхронный вариант send_request для загрузчика страниц
+        
+        Args:
+            fetcher (AiohttpFetcher or HttpxFetcher): Асинхронный загрузчик
+            url (str): URL страницы
+            headers (dict): Заголовки запроса
+            head_only (bool): Читать страницу только до ссылки на торрент
+            
+        Returns:
+            tuple: (status, headers, content)
+        """
+        if not self.proxy_pool:
+            return await fetcher.fetch(url, headers, head_only)
+            
+        tried = []
+        while True:
+            proxy = self.proxy_pool.choose(exclude=tried)
+            started = time.monotonic()
+            try:
+                result = await fetcher.fetch(url, headers, head_only, proxy.proxies)
+            except fetcher.errors as e:
+                self.proxy_pool.record_failure(proxy, str(e) or "таймаут")
+                tried.append(proxy)
+                if len(tried) >= min(self.proxy_failover_attempts, len(self.proxy_pool)):
+                    raise
+                logger.warning(f"Ошибка соединения через прокси {proxy.name}, повтор через другой прокси")
+                continue
+                
+            self.proxy_pool.record_success(proxy, time.monotonic() - started)
+            return result
+
+    def proxy_stats(self):
+        """
+        Возвращает состояние прокси пула
+        
+        Returns:
+            list: Состояние каждого прокси (пустой список, если прокси не используются)
+        """
+        return self.proxy_pool.stats() if self.proxy_pool else []
+
+    def create_session(self):
+        """
+        Создает синхронную сессию выбранного HTTP-клиента
+        
+        Returns:
+            requests.Session or HttpxSession: Новая сессия
+        """
+        return create_session(
+            self.transport,
+            pool_size=self.fetch_concurrency,
+            keepalive_expiry=self.keepalive_expiry
+        )
 
     def ensure_session(self):
         """
-        Убеждается, что сессия активна, или создает новую
+        Убеждается, что сессия активна, или создает новую.
+        Сессия считается активной, пока не истек срок действия ее cookie
+        и ответы сервера не показывают, что авторизация потеряна.
+        Повторный вход выполняется одним потоком, остальные ожидают его результата
         
         Returns:
             bool: True, если сессия активна
         """
-        try:
-            # Проверяем сессию простым запросом
-            test_url = f"{self.base_url}index.php"
-            test_response = self.session.get(
-                test_url, 
-                headers=self.headers, 
-                proxies=self.proxies, 
-                timeout=self.request_timeout
-            )
+        if self.logged_in and not self.session_expired():
+            return True
             
-            # Проверяем, что мы не получили ошибку и что мы все еще авторизованы
-            if test_response.status_code == 200 and self.is_logged_in_page(test_response.text):
-                logger.debug("Сессия активна")
+        with self.session_lock:
+            # Пока мы ждали блокировку, другой поток мог уже авторизоваться
+            if self.logged_in and not self.session_expired():
                 return True
                 
-            logger.warning("Сессия недействительна, восстановление")
+            # Не повторяем вход сразу после неудачи, чтобы не устраивать шторм авторизаций
+            if time.time() - self.last_login_failure < self.login_retry_interval:
+                logger.debug("Повторная авторизация отложена после недавней неудачи")
+                return False
+                
+            if self.logged_in:
+                logger.info("Срок действия сессии истек, повторная авторизация")
+            
+            # Пересоздаем сессию и заново авторизуемся
+            try:
+                self.logged_in = False
+                self.retire_session(self.session)
+                self.session = self.create_session()
+                self.session_generation += 1
+                if self.login():
+                    return True
+            except Exception as e:
+                logger.error(f"Не удалось пересоздать сессию: {e}")
+                
+            self.last_login_failure = time.time()
+            return False
+
+    def retire_session(self, session):
+        """
+        Откладывает закрытие замененной сессии (вызывается под session_lock): другие
+        потоки могут еще выполнять на ней запросы. Закрываются сессии, замененные
+        раньше, чем два таймаута запроса назад
+        
+        Args:
+            session: Замененная сессия
+        """
+        now = time.monotonic()
+        self.retired_sessions.append((now, session))
+        retired = []
+        for retired_at, old_session in self.retired_sessions:
+            if now - retired_at < self.request_timeout * 2:
+                retired.append((retired_at, old_session))
+                continue
+            try:
+                old_session.close()
+            except Exception as e:
+                logger.debug(f"Ошибка при закрытии замененной сессии: {e}")
+        self.retired_sessions = retired
+
+    def invalidate_session(self, generation):
+        """
+        Помечает сессию недействительной, если она не была заменена другим потоком
+        
+        Args:
+            generation (int): Поколение сессии, на которой была обнаружена ошибка
+        """
+        with self.session_lock:
+            if generation == self.session_generation and self.logged_in:
+                logger.warning("Сессия недействительна, восстановление")
+                self.logged_in = False
+
+    def save_cookies(self):
+        """
+        Сохраняет cookie текущей сессии в файл, доступный только владельцу
+        """
+        if not self.cookie_file:
+            return
+            
+        cookies = [
+            {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'expires': cookie.expires,
+                'secure': cookie.secure
+            }
+            for cookie in self.session.cookies
+        ]
+        
+        tmp_path = f"{self.cookie_file}.tmp"
+        try:
+            cookie_dir = os.path.dirname(os.path.abspath(self.cookie_file))
+            os.makedirs(cookie_dir, exist_ok=True)
+            # Файл создается сразу с правами 0600, затем атомарно заменяет старый
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as file:
+                json.dump(cookies, file)
+            os.replace(tmp_path, self.cookie_file)
+            logger.debug(f"Cookie сессии сохранены в {self.cookie_file}")
         except Exception as e:
-            logger.warning(f"Ошибка при проверке сессии: {e}")
+            logger.error(f"Ошибка при сохранении cookie сессии: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load_cookies(self):
+        """
+        Загружает cookie сессии, сохраненные при прошлом запуске. Действительность
+        сессии не проверяется запросом: если авторизация потеряна, это обнаружится
+        по первому ответу сервера и будет выполнен повторный вход
         
-        # Пересоздаем сессию и заново авторизуемся
+        Returns:
+            bool: True, если загружена непросроченная сессия
+        """
+        if not self.cookie_file or not os.path.exists(self.cookie_file):
+            return False
+            
         try:
-            self.session = requests.Session()
-            self.logged_in = False
-            return self.login()
+            with open(self.cookie_file) as file:
+                cookies = json.load(file)
+                
+            for cookie in cookies:
+                self.session.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/'),
+                    expires=cookie.get('expires'),
+                    secure=cookie.get('secure', False)
+                )
         except Exception as e:
-            logger.error(f"Не удалось пересоздать сессию: {e}")
+            logger.error(f"Ошибка при загрузке cookie сессии: {e}")
+            self.session.cookies.clear()
+            return False
+            
+        self.update_session_expiry()
+        if not cookies or self.session_expired():
+            logger.info("Сохраненная сессия устарела, потребуется авторизация")
+            self.session.cookies.clear()
+            self.session_expires = None
+            return False
+            
+        self.logged_in = True
+        logger.info("Восстановлена сохраненная сессия RuTracker")
+        return True
+
+    def update_session_expiry(self):
+        """
+        Запоминает время истечения cookie текущей сессии
+        """
+        expires = [cookie.expires for cookie in self.session.cookies if cookie.expires]
+        self.session_expires = min(expires) if expires else None
+
+    def session_expired(self):
+        """
+        Проверяет, истек ли срок действия cookie сессии
+        
+        Returns:
+            bool: True, если сессию пора обновить
+        """
+        if self.session_expires is None:
             return False
+        return time.time() >= self.session_expires - self.session_expiry_margin
+
+    def response_logged_in(self, response):
+        """
+        Проверяет по полученному ответу, что авторизация не потеряна
+        
+        Args:
+            response: Ответ сервера
+            
+        Returns:
+            bool: True, если ответ получен авторизованным пользователем
+        """
+        if response.status_code != 200:
+            return True
+        # Торрент-файлы и прочие бинарные ответы не содержат разметки страницы
+        if 'text/html' not in response.headers.get('Content-Type', ''):
+            return True
+        return self.is_logged_in_page(response.content)
+
+    def decode_response(self, response):
+        """
+        Декодирует тело ответа в известной кодировке страницы
+        
+        Args:
+            response: Ответ сервера
+            
+        Returns:
+            str: Текст страницы
+        """
+        return self.decoder.decode(response.url, response.headers.get('Content-Type'), response.content)
+
+    def request_page(self, url, headers=None, stream=False):
+        """
+        Выполняет GET-запрос с пассивной проверкой сессии: если ответ показывает,
+        что авторизация потеряна, выполняет повторный вход и повторяет запрос один раз
+        
+        Args:
+            url (str): URL запроса
+            headers (dict): Заголовки запроса (по умолчанию стандартные)
+            stream (bool): Потоковое чтение ответа
+            
+        Returns:
+            Response or None: Ответ сервера или None, если авторизоваться не удалось
+                или трекер временно недоступен
+        """
+        for attempt in range(2):
+            if not self.breaker.allow_request():
+                logger.warning(f"Запрос {url} пропущен: трекер временно недоступен")
+                return None
+                
+            if not self.ensure_session():
+                # Трекер не ответил на запрос: пробный запрос возвращается выключателю
+                self.breaker.release_probe()
+                logger.error(f"Не удалось выполнить запрос {url}: сессия недействительна")
+                return None
+                
+            # Сначала поколение, затем сессия: так ошибка на старой сессии
+            # никогда не сбросит уже восстановленную другим потоком
+            generation = self.session_generation
+            session = self.session
+                
+            # Ограничиваем частоту запросов
+            self.rate_limit_request(url)
+            
+            try:
+                response = self.send_request(
+                    session, 'get', url,
+                    headers=headers or self.headers,
+                    stream=stream
+                )
+            except self.transport_errors as e:
+                self.breaker.record_failure(str(e))
+                raise
+            except Exception:
+                self.breaker.release_probe()
+                raise
+                
+            self.record_response_status(response.status_code, response.headers)
+            if self.response_logged_in(response):
+                return response
+                
+            response.close()
+            self.invalidate_session(generation)
+            
+        logger.error(f"Не удалось выполнить запрос {url}: авторизация не восстановлена")
+        return None
+
+    def record_response_status(self, status, response_headers):
+        """
+        Передает результат запроса выключателю: 429 и ошибки сервера считаются сбоями
+        
+        Args:
+            status (int): HTTP-статус ответа
+            response_headers: Заголовки ответа
+        """
+        if status == 429 or status >= 500:
+            self.breaker.record_failure(
+                f"статус {status}",
+                retry_after=parse_retry_after(response_headers.get('Retry-After'))
+            )
+        else:
+            self.breaker.record_success()
+
+    def tracker_available(self):
+        """
+        Проверяет, разрешены ли сейчас запросы к трекеру
+        
+        Returns:
+            bool: False, если выключатель приостановил запросы
+        """
+        return not self.breaker.is_open()
+
+    def breaker_stats(self):
+        """
+        Возвращает состояние выключателя запросов
+        
+        Returns:
+            dict: Состояние и счетчики выключателя
+        """
+        return self.breaker.stats()
 
     def is_logged_in_page(self, html_content):
         """
         Проверяет, содержит ли страница признаки авторизованного пользователя
         
         Args:
-            html_content (str): HTML-содержимое страницы
+            html_content (str or bytes): HTML-содержимое страницы
             
         Returns:
             bool: True, если пользователь авторизован
         """
+        if isinstance(html_content, bytes):
+            return b"logged-in" in html_content or b"logout" in html_content
         return "logged-in" in html_content or "logout" in html_content
 
     def login(self):
@@ -155,18 +598,18 @@ class RutrackerAPI:
         }
 
         try:
-            response = self.session.post(
-                login_url, 
-                data=payload, 
-                headers=self.headers, 
-                proxies=self.proxies,
-                timeout=self.request_timeout
+            response = self.send_request(
+                self.session, 'post', login_url,
+                data=payload,
+                headers=self.headers
             )
             response.raise_for_status()  # Проверяем статус ответа
             
-            self.logged_in = self.is_logged_in_page(response.text)
+            self.logged_in = self.is_logged_in_page(response.content)
             
             if self.logged_in:
+                self.update_session_expiry()
+                self.save_cookies()
                 logger.info("Успешная авторизация на RuTracker")
             else:
                 logger.error("Не удалось авторизоваться на RuTracker")
@@ -176,25 +619,82 @@ class RutrackerAPI:
             logger.error(f"Ошибка при авторизации: {e}")
             return False
 
-    def rate_limit_request(self):
+    def limiter_for(self, url):
+        """
+        Выбирает ограничитель частоты для URL
+        
+        Args:
+            url (str): URL запроса
+            
+        Returns:
+            TokenBucket: Ограничитель для скачивания торрент-файлов или для страниц
+        """
+        return self.download_limiter if 'dl.php' in url else self.page_limiter
+
+    def rate_limit_request(self, url=''):
         """
         Ограничивает частоту запросов для предотвращения блокировки
+        
+        Args:
+            url (str): URL запроса (определяет используемый ограничитель)
+        """
+        self.limiter_for(url).acquire()
+
+    async def rate_limit_request_async(self, url=''):
+        """
+        Асинхронно ограничивает частоту запросов (общий лимит с синхронными запросами)
+        
+        Args:
+            url (str): URL запроса (определяет используемый ограничитель)
         """
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
+        await self.limiter_for(url).acquire_async()
+
+    def rate_limit_stats(self):
+        """
+        Возвращает статистику ожидания ограничителей частоты
+        
+        Returns:
+            dict: {'pages': {...}, 'downloads': {...}}
+        """
+        return {
+            'pages': self.page_limiter.stats(),
+            'downloads': self.download_limiter.stats()
+        }
+
+    def get_page_content(self, url, max_age=None, refresh=False, head_ok=False):
+        """
+        Получает содержимое страницы (с кэшированием результатов). Одновременные
+        запросы одной страницы из разных потоков выполняются одним обращением к трекеру
         
-        if time_since_last_request < self.request_interval:
-            # Если с момента последнего запроса прошло меньше минимального интервала,
-            # делаем паузу на оставшееся время
-            wait_time = self.request_interval - time_since_last_request
-            logger.debug(f"Ограничение запросов: ожидание {wait_time:.2f} сек")
-            time.sleep(wait_time)
+        Args:
+            url (str): URL страницы
+            max_age (float): Допустимый возраст записи кэша (по умолчанию TTL кэша)
+            refresh (bool): Игнорировать кэш и запросить страницу заново
+            head_ok (bool): Достаточно начала страницы до ссылки на торрент: тогда
+                можно воспользоваться результатом идущей сейчас проверки обновлений
             
-        self.last_request_time = time.time()
+        Returns:
+            str or None: HTML-код страницы или None в случае ошибки
+        """
+        if not refresh:
+            cached_content = self.page_cache.get(url, max_age)
+            if cached_content is not None:
+                logger.debug(f"Страница {url} получена из кэша")
+                return cached_content
+
+        key = normalize_url(url)
+        if head_ok:
+            joined, result = self.flights.join(('head', key), timeout=self.request_timeout)
+            if joined and result['content']:
+                logger.debug(f"Страница {url} получена из выполняющейся проверки обновлений")
+                content = result['content']
+                return self.decoder.decode(url, None, content) if isinstance(content, bytes) else content
+                
+        return self.flights.do(('page', key), lambda: self.fetch_page_content(url))
 
-    def get_page_content(self, url):
+    def fetch_page_content(self, url):
         """
-        Получает содержимое страницы (с кэшированием результатов)
+        Запрашивает страницу у трекера и сохраняет ее в кэш
         
         Args:
             url (str): URL страницы
@@ -203,106 +703,248 @@ class RutrackerAPI:
             str or None: HTML-код страницы или None в случае ошибки
         """
         try:
-            # Проверяем состояние сессии и переподключаемся если необходимо
-            if not self.ensure_session():
-                logger.error("Не удалось получить страницу: сессия недействительна")
+            response = self.request_page(url)
+            if response is None:
                 return None
                 
-            # Ограничиваем частоту запросов
-            self.rate_limit_request()
-                
-            response = self.session.get(
-                url, 
-                headers=self.headers, 
-                proxies=self.proxies,
-                timeout=self.request_timeout
-            )
             response.raise_for_status()
-            return response.text
+            page_content = self.decode_response(response)
+            self.page_cache.put(url, page_content)
+            return page_content
         except Exception as e:
             logger.error(f"Ошибка при получении страницы {url}: {e}")
             return None
 
-    async def get_page_content_async(self, url):
+    def conditional_headers(self, url):
         """
-        Асинхронно получает содержимое страницы
+        Формирует заголовки условного запроса по сохраненным валидаторам страницы
         
         Args:
             url (str): URL страницы
             
         Returns:
-            str or None: HTML-код страницы или None в случае ошибки
+            dict: Заголовки запроса
         """
-        # Сначала проверяем наличие результата в кэше
-        result = self.get_page_content.__wrapped__.__self__.cache_get(url)
-        if result is not None:
-            return result
+        validators = self.page_validators.get(url, {})
+        headers = dict(self.headers)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def store_validators(self, url, response_headers, body):
+        """
+        Сохраняет валидаторы ответа для последующих условных запросов.
+        Вызывается только из проверки обновлений, чтобы просмотр страницы
+        из интерфейса не скрыл изменение от плановой проверки
         
-        try:
-            # Необходимо убедиться, что мы авторизованы
-            if not self.ensure_session():
-                logger.error("Не удалось получить страницу асинхронно: сессия недействительна")
-                return None
+        Args:
+            url (str): URL страницы
+            response_headers: Заголовки ответа сервера
+            body (str or bytes): Прочитанное содержимое ответа
+            
+        Returns:
+            bool: True, если содержимое страницы изменилось с прошлого запроса
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8', errors='ignore')
+        content_hash = hashlib.sha1(body).hexdigest()
+        previous = self.page_validators.get(url, {})
+        self.page_validators[url] = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'hash': content_hash
+        }
+        return previous.get('hash') != content_hash
+
+    def forget_validators(self, url):
+        """
+        Удаляет сохраненные валидаторы страницы, если обновление не удалось
+        обработать до конца: следующий условный запрос не получит 304,
+        и страница будет проверена заново
+
+        Args:
+            url (str): URL страницы
+        """
+        self.page_validators.pop(url, None)
+
+    async def fetch_page_async(self, fetcher, url, semaphore, conditional=False, head_only=False):
+        """
+        Асинхронно получает одну страницу. Чтение начала страницы при проверке
+        обновлений регистрируется как выполняющийся запрос: get_page_content(head_ok=True)
+        из обработчиков бота дождется его результата вместо повторного запроса
+        
+        Args:
+            fetcher (AiohttpFetcher or HttpxFetcher): Общий асинхронный загрузчик
+            url (str): URL страницы
+            semaphore (asyncio.Semaphore): Ограничение числа одновременных запросов
+            conditional (bool): Выполнить условный запрос по сохраненным валидаторам
+            head_only (bool): Читать страницу только до ссылки на торрент
+            
+        Returns:
+            dict: {'content', 'status', 'modified', 'error'}
+        """
+        if not head_only:
+            return await self.request_page_async(fetcher, url, semaphore, conditional, head_only)
+        return await self.flights.do_async(
+            ('head', normalize_url(url)),
+            lambda: self.request_page_async(fetcher, url, semaphore, conditional, head_only)
+        )
+
+    async def request_page_async(self, fetcher, url, semaphore, conditional=False, head_only=False):
+        """
+        Асинхронно получает одну страницу через общий пул соединений
+        
+        Args:
+            fetcher (AiohttpFetcher or HttpxFetcher): Общий асинхронный загрузчик
+            url (str): URL страницы
+            semaphore (asyncio.Semaphore): Ограничение числа одновременных запросов
+            conditional (bool): Выполнить условный запрос по сохраненным валидаторам
+            head_only (bool): Читать страницу только до ссылки на торрент
+            
+        Returns:
+            dict: {'content', 'status', 'modified', 'error'}
+        """
+        result = {'content': None, 'status': None, 'modified': True, 'error': None}
+        headers = self.conditional_headers(url) if conditional else self.headers
+        
+        async with semaphore:
+            for attempt in range(2):
+                if not self.breaker.allow_request():
+                    result['error'] = "трекер временно недоступен"
+                    result['skipped'] = True
+                    return result
+                    
+                # Поколение сессии, cookie которой сейчас использует загрузчик
+                generation = fetcher.session_generation
+                await self.rate_limit_request_async(url)
                 
-            # Создаем асинхронную сессию и копируем куки из обычной сессии
-            cookies = dict(self.session.cookies)
-            
-            # Подготавливаем прокси
-            proxy = None
-            if self.proxies:
-                proxy = self.proxies.get('http') or self.proxies.get('https')
-            
-            async with aiohttp.ClientSession(cookies=cookies) as session:
-                # Ограничиваем частоту запросов
-                current_time = time.time()
-                time_since_last_request = current_time - self.last_request_time
-                if time_since_last_request < self.request_interval:
-                    await asyncio.sleep(self.request_interval - time_since_last_request)
+                try:
+                    status, response_headers, content = await self.send_request_async(
+                        fetcher, url, headers, head_only
+                    )
+                except fetcher.errors as e:
+                    result['error'] = str(e) or "таймаут"
+                    self.breaker.record_failure(result['error'])
+                    return result
+                except Exception as e:
+                    result['error'] = str(e)
+                    self.breaker.release_probe()
+                    return result
                     
-                self.last_request_time = time.time()
+                result['status'] = status
+                self.record_response_status(status, response_headers)
                 
-                # Выполняем запрос
-                async with session.get(
-                    url, 
-                    headers=self.headers, 
-                    proxy=proxy, 
-                    timeout=self.request_timeout
-                ) as response:
-                    if response.status != 200:
-                        logger.error(f"Ошибка при асинхронном запросе страницы {url}: статус {response.status}")
-                        return None
-                        
-                    content = await response.text()
+                if status == 304:
+                    result['modified'] = False
+                    return result
+                if status != 200:
+                    result['error'] = f"статус {status}"
+                    return result
                     
-                    # Кэшируем результат
-                    self.get_page_content.__wrapped__.__self__.cache_put(url, content)
+                if self.is_logged_in_page(content):
+                    break
                     
-                    return content
-        except asyncio.TimeoutError:
-            logger.error(f"Таймаут при асинхронном запросе страницы {url}")
-            return None
-        except Exception as e:
-            logger.error(f"Ошибка при асинхронном запросе страницы {url}: {e}")
-            return None
+                # Авторизация потеряна: восстанавливаем сессию (один поток на всех)
+                # и передаем новые cookie в асинхронный загрузчик
+                self.invalidate_session(generation)
+                loop = asyncio.get_running_loop()
+                if not await loop.run_in_executor(None, self.ensure_session):
+                    result['error'] = "сессия недействительна"
+                    self.breaker.release_probe()
+                    return result
+                generation = self.session_generation
+                fetcher.update_cookies(dict(self.session.cookies), generation)
+            else:
+                result['error'] = "авторизация не восстановлена"
+                return result
+                
+        if conditional:
+            result['modified'] = self.store_validators(url, response_headers, content)
+        if not head_only:
+            self.page_cache.put(url, content)
+        result['content'] = content
+        return result
 
-    async def get_multiple_pages_async(self, urls):
+    async def fetch_pages_async(self, urls, conditional=False, head_only=False):
         """
-        Асинхронно получает содержимое нескольких страниц
+        Асинхронно получает несколько страниц через один загрузчик с общим пулом
+        соединений, ограничением одновременных запросов и общим лимитом частоты
         
         Args:
             urls (list): Список URL-адресов
+            conditional (bool): Выполнять условные запросы по сохраненным валидаторам
+            head_only (bool): Читать страницы только до ссылки на торрент
             
         Returns:
-            dict: Словарь {url: content} с результатами
+            dict: {url: {'content', 'status', 'modified', 'error'}}
+        """
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.ensure_session):
+            logger.error("Не удалось получить страницы: сессия недействительна")
+            return {
+                url: {'content': None, 'status': None, 'modified': True, 'error': "сессия недействительна"}
+                for url in urls
+            }
+            
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        
+        # Копируем cookie авторизации из синхронной сессии вместе с ее поколением
+        # (сначала поколение, затем cookie, как в request_page).
+        # При пуле разбора начала страниц передаются ему байтами и декодируются в его процессах
+        generation = self.session_generation
+        fetcher = create_fetcher(
+            self.transport,
+            cookies=dict(self.session.cookies),
+            session_generation=generation,
+            raw_heads=head_only and self.parse_pool is not None,
+            pool_size=self.fetch_concurrency,
+            timeout=self.request_timeout,
+            decoder=self.decoder,
+            chunk_size=self.stream_chunk_size,
+            max_head_bytes=self.stream_max_bytes,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        try:
+            results = await asyncio.gather(*[
+                self.fetch_page_async(fetcher, url, semaphore, conditional, head_only)
+                for url in urls
+            ])
+        finally:
+            await fetcher.close()
+            
+        skipped_count = 0
+        for url, result in zip(urls, results):
+            if result.get('skipped'):
+                skipped_count += 1
+            elif result['error']:
+                logger.error(f"Ошибка при асинхронном запросе страницы {url}: {result['error']}")
+        if skipped_count:
+            logger.warning(f"Трекер временно недоступен, пропущено запросов: {skipped_count}")
+                
+        return dict(zip(urls, results))
+
+    def fetch_pages(self, urls, conditional=False, head_only=False):
         """
-        tasks = [self.get_page_content_async(url) for url in urls]
-        results = await asyncio.gather(*tasks)
+        Получает несколько страниц параллельно (использует асинхронный код под капотом)
         
-        return {url: content for url, content in zip(urls, results) if content is not None}
+        Args:
+            urls (list): Список URL-адресов
+            conditional (bool): Выполнять условные запросы по сохраненным валидаторам
+            head_only (bool): Читать страницы только до ссылки на торрент
+            
+        Returns:
+            dict: {url: {'content', 'status', 'modified', 'error'}}; для запросов,
+                  пропущенных из-за недоступности трекера, дополнительно 'skipped': True
+        """
+        if not urls:
+            return {}
+        return asyncio.run(self.fetch_pages_async(urls, conditional, head_only))
 
     def get_multiple_pages(self, urls):
         """
-        Получает содержимое нескольких страниц (использует асинхронный код под капотом)
+        Получает содержимое нескольких страниц
         
         Args:
             urls (list): Список URL-адресов
@@ -310,142 +952,342 @@ class RutrackerAPI:
         Returns:
             dict: Словарь {url: content} с результатами
         """
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(self.get_multiple_pages_async(urls))
-        finally:
-            loop.close()
+        results = self.fetch_pages(urls)
+        return {url: result['content'] for url, result in results.items() if result['content'] is not None}
+
+    def get_pages_if_modified(self, urls):
+        """
+        Параллельно получает начала страниц условными запросами для проверки обновлений
+        
+        Args:
+            urls (list): Список URL-адресов
+            
+        Returns:
+            dict: {url: (modified, content)}. modified равен False, если сервер ответил 304
+                  или содержимое не изменилось; content равен None при ошибке или отсутствии изменений
+                  и передается байтами, если включен пул разбора (parse_topic декодирует его там).
+                  Страницы, запрос которых пропущен из-за недоступности трекера, не включаются
+        """
+        results = self.fetch_pages(urls, conditional=True, head_only=True)
+        return {
+            url: (result['modified'], result['content'])
+            for url, result in results.items() if not result.get('skipped')
+        }
+
+    def topic_id_from_url(self, url):
+        """
+        Извлекает идентификатор раздачи из ссылки
+        
+        Args:
+            url (str): URL страницы раздачи
+            
+        Returns:
+            str or None: Идентификатор раздачи или None
+        """
+        match = TOPIC_ID_RE.search(url or '')
+        return match.group(1) if match else None
+
+    def get_topics_data(self, topic_ids):
+        """
+        Получает данные раздач пакетным API трекера (до 100 раздач за запрос)
+        
+        Args:
+            topic_ids (list): Идентификаторы раздач
+            
+        Returns:
+            dict: {topic_id: данные раздачи или None, если раздача не найдена}.
+                  Раздачи, для которых запрос не удался, в результат не входят
+        """
+        topics_data = {}
+        for start in range(0, len(topic_ids), self.bulk_batch_size):
+            # Запросы к API учитываются тем же выключателем, что и запросы страниц
+            if not self.breaker.allow_request():
+                logger.warning("Пакетный запрос данных раздач пропущен: трекер временно недоступен")
+                break
+            batch = topic_ids[start:start + self.bulk_batch_size]
+            self.rate_limit_request(self.api_url)
+            try:
+                response = self.send_request(
+                    self.session, 'get', f"{self.api_url}get_tor_topic_data",
+                    params={'by': 'topic_id', 'val': ','.join(batch)},
+                    headers=self.headers
+                )
+                self.record_response_status(response.status_code, response.headers)
+                response.raise_for_status()
+                result = response.json().get('result') or {}
+            except self.transport_errors as e:
+                self.breaker.record_failure(str(e))
+                logger.error(f"Ошибка при пакетном запросе данных раздач: {e}")
+                continue
+            except Exception as e:
+                self.breaker.release_probe()
+                logger.error(f"Ошибка при пакетном запросе данных раздач: {e}")
+                continue
+                
+            for topic_id in batch:
+                topics_data[topic_id] = result.get(topic_id)
+                
+        return topics_data
+
+    def get_changed_topics(self, urls):
+        """
+        Определяет раздачи, изменившиеся с прошлой проверки, по info_hash и времени
+        регистрации из пакетного API. Полную проверку страницы нужно выполнять
+        только для них
+        
+        Args:
+            urls (list): Список URL-адресов раздач
+            
+        Returns:
+            dict: {url: signature} для изменившихся раздач и раздач, состояние которых
+                  неизвестно (signature равен None). После успешной проверки страницы
+                  signature передается в mark_topic_checked
+        """
+        topic_ids = {url: self.topic_id_from_url(url) for url in urls}
+        topics_data = self.get_topics_data(sorted({topic_id for topic_id in topic_ids.values() if topic_id}))
+        
+        changed = {}
+        for url in urls:
+            topic_id = topic_ids[url]
+            topic_data = topics_data.get(topic_id)
+            if not topic_data:
+                # Нет идентификатора, раздача не найдена или запрос не удался: проверяем страницу
+                changed[url] = None
+                continue
+                
+            signature = (topic_data.get('info_hash'), topic_data.get('reg_time'))
+            if self.topic_signatures.get(topic_id) != signature:
+                changed[url] = signature
+                
+        logger.info(f"Пакетная проверка: изменилось раздач {len(changed)} из {len(urls)}")
+        return changed
+
+    def mark_topic_checked(self, url, signature):
+        """
+        Запоминает состояние раздачи после успешной проверки ее страницы
+        
+        Args:
+            url (str): URL страницы раздачи
+            signature (tuple): Состояние из get_changed_topics
+        """
+        topic_id = self.topic_id_from_url(url)
+        if topic_id and signature is not None:
+            self.topic_signatures[topic_id] = signature
 
     def parse_date(self, page_content):
         """
         Извлекает дату обновления из содержимого страницы
         
         Args:
-            page_content (str): HTML-код страницы
+            page_content (str or bytes): HTML-код страницы
             
         Returns:
             str or None: Дата обновления или None, если не найдена
         """
+        topic = self.parse_topic(page_content)
+        return topic['date'] if topic else None
+
+    def get_page_title(self, url):
+        """
+        Извлекает заголовок страницы
+        
+        Args:
+            url (str): URL страницы
+            
+        Returns:
+            str: Заголовок страницы или 'No Title' в случае ошибки
+        """
+        topic = self.fetch_topic(url)
+        return topic['title'] if topic else 'No Title'
+
+    def get_edit_date(self, url, refresh=False):
+        """
+        Получает дату обновления страницы
+        
+        Args:
+            url (str): URL страницы
+            refresh (bool): Игнорировать кэш и запросить страницу заново
+            
+        Returns:
+            str or None: Дата обновления или None
+        """
+        page_content = self.get_page_content(url, refresh=refresh, head_ok=True)
+        return self.parse_date(page_content)
+
+    def parse_topic(self, page_content, url=None):
+        """
+        Извлекает заголовок, дату обновления, ссылку на торрент и статус раздачи
+        за один проход по странице. Если быстрый разбор не нашел ссылку на торрент
+        (например, изменилась разметка), недостающие поля добираются через BeautifulSoup
+        
+        Args:
+            page_content (str or bytes): HTML-код страницы
+            url (str): URL страницы, чтобы декодировать байты в кодировке ее хоста
+            
+        Returns:
+            dict or None: {'title', 'date', 'download_link', 'info_hash', 'status'} или None, если страница пуста
+        """
         if not page_content:
             return None
             
+        encoding = self.decoder.encoding_for(url) if url else self.default_encoding
         try:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            date_span = soup.find('span', class_='posted_since hide-for-print')
-            if date_span:
-                date_text = date_span.text
-                match = re.search(r'ред\. (\d{2}-\w{3}-\d{2} \d{2}:\d{2})', date_text)
-                if match:
-                    return match.group(1)
+            if self.parse_pool:
+                topic = self.parse_pool.extract(page_content, encoding)
+            else:
+                topic = extract_topic(page_content, encoding)
         except Exception as e:
-            logger.error(f"Ошибка при парсинге даты: {e}")
+            logger.error(f"Ошибка при быстром разборе страницы: {e}")
+            topic = {'title': None, 'date': None, 'download_link': None, 'info_hash': None, 'status': None}
             
-        return None
+        if topic['download_link']:
+            topic['download_link'] = self.base_url + topic['download_link']
+        else:
+            soup_topic = self.parse_topic_soup(page_content, encoding)
+            for key, value in soup_topic.items():
+                if topic.get(key) is None:
+                    topic[key] = value
+                    
+        if not topic['title']:
+            topic['title'] = 'No Title'
+            
+        return topic
 
-    def get_page_title(self, url):
+    def parse_topic_soup(self, page_content, encoding=None):
         """
-        Извлекает заголовок страницы
+        Извлекает поля страницы раздачи полным разбором через BeautifulSoup
         
         Args:
-            url (str): URL страницы
+            page_content (str or bytes): HTML-код страницы
+            encoding (str): Кодировка, если страница передана байтами
             
         Returns:
-            str: Заголовок страницы или 'No Title' в случае ошибки
+            dict: {'title', 'date', 'download_link', 'status'}
         """
         try:
-            page_content = self.get_page_content(url)
-            if page_content:
-                soup = BeautifulSoup(page_content, 'html.parser')
-                title_tag = soup.find('title')
-                if title_tag:
-                    title_text = title_tag.text.split('/')[0].strip()
-                    return title_text
+            topic = extract_topic_soup(page_content, encoding or self.default_encoding)
         except Exception as e:
-            logger.error(f"Ошибка при получении заголовка страницы {url}: {e}")
+            logger.error(f"Ошибка при разборе страницы: {e}")
+            return {'title': None, 'date': None, 'download_link': None, 'status': None}
             
-        return 'No Title'
+        if topic['download_link']:
+            topic['download_link'] = self.base_url + topic['download_link']
+        return topic
 
-    def get_edit_date(self, url):
+    def fetch_topic(self, url, refresh=False):
         """
-        Получает дату обновления страницы
+        Получает страницу раздачи одним запросом и извлекает из нее все нужные поля
         
         Args:
             url (str): URL страницы
+            refresh (bool): Игнорировать кэш и запросить страницу заново
             
         Returns:
-            str or None: Дата обновления или None
+            dict or None: {'title', 'date', 'download_link', 'status'} или None в случае ошибки
         """
-        page_content = self.get_page_content(url)
-        return self.parse_date(page_content)
+        page_content = self.get_page_content(url, refresh=refresh)
+        return self.parse_topic(page_content)
 
-    def download_torrent_by_url(self, page_url, file_path):
+    def extract_download_link(self, page_content):
         """
-        Скачивает торрент-файл по URL страницы
+        Извлекает ссылку на скачивание торрент-файла из содержимого страницы
+        
+        Args:
+            page_content (str or bytes): HTML-код страницы
+            
+        Returns:
+            str or None: Полный URL торрент-файла или None, если ссылка не найдена
+        """
+        topic = self.parse_topic(page_content)
+        return topic['download_link'] if topic else None
+
+    def download_torrent(self, page_url, page_content=None, download_link=None):
+        """
+        Скачивает торрент-файл по URL страницы в память
         
         Args:
             page_url (str): URL страницы с торрентом
-            file_path (str): Путь для сохранения торрент-файла
+            page_content (str): Уже полученный HTML-код страницы (чтобы не запрашивать ее повторно)
+            download_link (str): Уже извлеченная ссылка на торрент-файл
             
         Returns:
-            str or None: Путь к файлу или None в случае ошибки
+            bytes or None: Содержимое торрент-файла или None в случае ошибки
         """
         try:
-            # Проверяем состояние сессии и переподключаемся если необходимо
-            if not self.ensure_session():
-                logger.error("Не удалось скачать торрент: сессия недействительна")
-                return None
-
-            # Получаем страницу с торрентом
-            response = self.session.get(
-                page_url, 
-                headers=self.headers, 
-                proxies=self.proxies,
-                timeout=self.request_timeout
-            )
-            response.raise_for_status()
+            download_url = download_link
+            
+            if not download_url:
+                if not page_content:
+                    # Получаем страницу с торрентом
+                    response = self.request_page(page_url)
+                    if response is None:
+                        logger.error("Не удалось скачать торрент: сессия недействительна")
+                        return None
+                    response.raise_for_status()
+                    page_content = self.decode_response(response)
 
-            # Ищем ссылку на скачивание
-            soup = BeautifulSoup(response.text, "html.parser")
-            download_link_element = soup.select_one("a[href*='dl.php?t=']")
-            if not download_link_element:
-                logger.error(f"Ссылка на загрузку торрента не найдена для {page_url}")
-                return None
+                # Ищем ссылку на скачивание
+                download_url = self.extract_download_link(page_content)
+                if not download_url:
+                    logger.error(f"Ссылка на загрузку торрента не найдена для {page_url}")
+                    return None
 
             # Скачиваем торрент-файл
-            download_url = self.base_url + download_link_element["href"]
-            
-            # Делаем паузу перед следующим запросом
-            self.rate_limit_request()
-            
-            torrent_response = self.session.get(
-                download_url, 
-                headers=self.headers, 
-                proxies=self.proxies, 
-                stream=True,
-                timeout=self.request_timeout
-            )
+            torrent_response = self.request_page(download_url, stream=True)
+            if torrent_response is None:
+                logger.error("Не удалось скачать торрент: сессия недействительна")
+                return None
             torrent_response.raise_for_status()
             
-            # Создаем директорию, если не существует
-            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
-            
-            # Сохраняем файл
-            with open(file_path, 'wb') as file:
-                for chunk in torrent_response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-                    
-            logger.info(f"Торрент-файл скачан и сохранен в {file_path}")
-            return file_path
+            torrent_data = b''.join(torrent_response.iter_content(chunk_size=8192))
+            logger.info(f"Торрент-файл скачан для {page_url} ({len(torrent_data)} байт)")
+            return torrent_data
         except Exception as e:
             logger.error(f"Ошибка при загрузке торрента по ссылке {page_url}: {e}")
             return None
-            
+
+    def invalidate_page(self, url):
+        """
+        Удаляет страницу из кэша запросов
+        
+        Args:
+            url (str): URL страницы
+        """
+        if self.page_cache.invalidate(url):
+            logger.debug(f"Страница {url} удалена из кэша")
+
+    def coalesce_stats(self):
+        """
+        Возвращает статистику объединения одновременных запросов
+        
+        Returns:
+            dict: Выполненные и объединенные запросы
+        """
+        return self.flights.stats()
+
+    def parse_stats(self):
+        """
+        Возвращает статистику пула разбора страниц
+        
+        Returns:
+            dict or None: Счетчики пула или None, если страницы разбираются в основном процессе
+        """
+        return self.parse_pool.stats() if self.parse_pool else None
+
+    def cache_stats(self):
+        """
+        Возвращает статистику кэша запросов
+        
+        Returns:
+            dict: Счетчики кэша
+        """
+        return self.page_cache.stats()
+
     def clear_cache(self):
         """
         Очищает кэш запросов
         """
-        self.get_page_content.cache_clear()
+        self.page_cache.clear()
         logger.debug("Кэш запросов очищен")
             
     def close(self):
@@ -453,6 +1295,16 @@ class RutrackerAPI:
         Закрывает сессию
         """
         try:
+            if self.logged_in:
+                self.save_cookies()
+            if self.proxy_pool:
+                self.proxy_pool.stop()
+            if self.parse_pool:
+                self.parse_pool.close()
+            with self.session_lock:
+                for _, old_session in self.retired_sessions:
+                    old_session.close()
+                self.retired_sessions = []
             self.session.close()
             logger.debug("Сессия RutrackerAPI закрыта")
         except Exception as e:
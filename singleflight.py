@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """
+    Выполняющийся запрос и его результат
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединение одновременных запросов с одинаковым ключом: первый вызов
+    выполняет запрос, остальные дожидаются его результата вместо повторного
+    обращения к трекеру. Работает между потоками и между потоком и циклом asyncio
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def _join_or_lead(self, key):
+        """
+        Возвращает (call, leader): выполняющийся запрос с ключом key или новый
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.leaders += 1
+            return call, True
+
+    def _finish(self, key, call, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    @staticmethod
+    def _outcome(call):
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn):
+        """
+        Выполняет fn или дожидается результата уже выполняющегося вызова с тем же ключом
+
+        Args:
+            key: Ключ запроса
+            fn (callable): Функция без аргументов, выполняющая запрос
+
+        Returns:
+            Результат fn (общий для всех объединенных вызовов)
+        """
+        call, leader = self._join_or_lead(key)
+        if not leader:
+            logger.debug(f"Запрос {key} объединен с уже выполняющимся")
+            call.done.wait()
+            return self._outcome(call)
+
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    async def do_async(self, key, coro_factory):
+        """
+        Асинхронный вариант do: ожидание чужого результата не блокирует цикл событий
+
+        Args:
+            key: Ключ запроса
+            coro_factory (callable): Функция без аргументов, возвращающая корутину запроса
+
+        Returns:
+            Результат корутины (общий для всех объединенных вызовов)
+        """
+        call, leader = self._join_or_lead(key)
+        if not leader:
+            logger.debug(f"Запрос {key} объединен с уже выполняющимся")
+            await asyncio.get_running_loop().run_in_executor(None, call.done.wait)
+            return self._outcome(call)
+
+        try:
+            result = await coro_factory()
+        except BaseException as e:
+            # Отмена корутины тоже должна разбудить ожидающих
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    def join(self, key, timeout=None):
+        """
+        Дожидается результата выполняющегося вызова, не начиная новый
+
+        Args:
+            key: Ключ запроса
+            timeout (float): Максимальное время ожидания в секундах
+
+        Returns:
+            tuple: (joined, result). joined равен False, если вызова с таким ключом нет,
+                   он завершился ошибкой или не успел завершиться за timeout
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                return False, None
+            self.shared += 1
+
+        logger.debug(f"Ожидание результата выполняющегося запроса {key}")
+        if not call.done.wait(timeout) or call.error is not None:
+            return False, None
+        return True, call.result
+
+    def stats(self):
+        """
+        Returns:
+            dict: Число выполненных запросов, объединенных вызовов и выполняющихся сейчас
+        """
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,238 @@
+import re
+import sys
+import html
+import time
+import logging
+from datetime import datetime
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Регулярные выражения для однопроходного извлечения полей страницы раздачи
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+POSTED_SINCE_RE = re.compile(r'<span class="posted_since hide-for-print"[^>]*>(.*?)</span>', re.S)
+EDIT_DATE_RE = re.compile(r'ред\. (\d{2}-\w{3}-\d{2} \d{2}:\d{2})')
+DOWNLOAD_LINK_RE = re.compile(r'<a\s[^>]*href="([^"]*dl\.php\?t=[^"]*)"', re.I)
+# То же для непрочитанных байтов: разметка ссылки в кодировках трекера совпадает с ASCII
+DOWNLOAD_LINK_BYTES_RE = re.compile(DOWNLOAD_LINK_RE.pattern.encode(), re.I)
+STATUS_RE = re.compile(r'tor-icon\s+tor-([\w-]+)')
+MAGNET_HASH_RE = re.compile(r'magnet:\?xt=urn:btih:([0-9A-Fa-f]{40})')
+TAG_RE = re.compile(r'<[^>]+>')
+
+# Дата редактирования в формате трекера: 15-Мар-24 12:30
+TRACKER_DATE_RE = re.compile(r'(\d{2})-(\w{3})-(\d{2}) (\d{2}):(\d{2})')
+MONTHS = {
+    'янв': 1, 'фев': 2, 'мар': 3, 'апр': 4, 'май': 5, 'июн': 6,
+    'июл': 7, 'авг': 8, 'сен': 9, 'окт': 10, 'ноя': 11, 'дек': 12,
+}
+
+
+def extract_topic(page_content, encoding='windows-1251'):
+    """
+    Извлекает заголовок, дату редактирования, ссылку на торрент, info-hash из
+    magnet-ссылки и статус раздачи регулярными выражениями, без построения дерева документа.
+    Если какого-то поля на странице нет, она просматривается целиком (около 1 мс на 600 КБ),
+    а страница байтами сначала декодируется (еще 1-2 мс); замер - python topic_parser.py
+
+    Args:
+        page_content (str or bytes): HTML-код страницы
+        encoding (str): Кодировка, если страница передана байтами
+
+    Returns:
+        dict: {'title', 'date', 'download_link', 'info_hash', 'status'}; ненайденные поля равны None.
+              download_link относительный, как в разметке страницы
+    """
+    topic = {'title': None, 'date': None, 'download_link': None, 'info_hash': None, 'status': None}
+    if not page_content:
+        return topic
+    if isinstance(page_content, bytes):
+        page_content = page_content.decode(encoding, errors='replace')
+
+    match = TITLE_RE.search(page_content)
+    if match:
+        title_text = html.unescape(TAG_RE.sub('', match.group(1)))
+        topic['title'] = title_text.split('/')[0].strip()
+
+    # Дата редактирования находится в первом сообщении, ищем первый подходящий span
+    for match in POSTED_SINCE_RE.finditer(page_content):
+        date_match = EDIT_DATE_RE.search(html.unescape(TAG_RE.sub('', match.group(1))))
+        if date_match:
+            topic['date'] = date_match.group(1)
+        break
+
+    match = DOWNLOAD_LINK_RE.search(page_content)
+    if match:
+        topic['download_link'] = html.unescape(match.group(1))
+
+    match = MAGNET_HASH_RE.search(page_content)
+    if match:
+        topic['info_hash'] = match.group(1).upper()
+
+    match = STATUS_RE.search(page_content)
+    if match:
+        topic['status'] = match.group(1)
+
+    return topic
+
+
+def extract_topic_soup(page_content, encoding='windows-1251'):
+    """
+    Извлекает заголовок, дату редактирования и ссылку на торрент полным разбором
+    страницы через BeautifulSoup. Медленнее extract_topic, но не зависит от порядка
+    атрибутов в разметке, поэтому используется как запасной вариант
+
+    Args:
+        page_content (str or bytes): HTML-код страницы
+        encoding (str): Кодировка, если страница передана байтами
+
+    Returns:
+        dict: {'title', 'date', 'download_link', 'status'}; ненайденные поля равны None.
+              download_link относительный, как в разметке страницы
+    """
+    topic = {'title': None, 'date': None, 'download_link': None, 'status': None}
+    if isinstance(page_content, bytes):
+        page_content = page_content.decode(encoding, errors='replace')
+    soup = BeautifulSoup(page_content, 'html.parser')
+
+    title_tag = soup.find('title')
+    if title_tag:
+        topic['title'] = title_tag.text.split('/')[0].strip()
+
+    date_span = soup.find('span', class_='posted_since hide-for-print')
+    if date_span:
+        match = EDIT_DATE_RE.search(date_span.text)
+        if match:
+            topic['date'] = match.group(1)
+
+    download_link_element = soup.select_one("a[href*='dl.php?t=']")
+    if download_link_element:
+        topic['download_link'] = download_link_element["href"]
+
+    return topic
+
+
+def parse_tracker_date(date_text):
+    """
+    Преобразует дату редактирования в формате трекера в datetime
+
+    Args:
+        date_text (str): Дата вида '15-Мар-24 12:30'
+
+    Returns:
+        datetime or None: Дата или None, если формат не распознан
+    """
+    match = TRACKER_DATE_RE.search(date_text or '')
+    if not match:
+        return None
+    day, month_name, year, hour, minute = match.groups()
+    month = MONTHS.get(month_name.lower())
+    if not month:
+        return None
+    try:
+        return datetime(2000 + int(year), month, int(day), int(hour), int(minute))
+    except ValueError:
+        return None
+
+
+def topic_head_complete(page_head, start=0):
+    """
+    Проверяет, что начало страницы уже содержит все поля, нужные для проверки
+    обновлений: ссылка на торрент идет в первом сообщении после даты редактирования
+
+    Args:
+        page_head (str or bytes): Прочитанное начало HTML-кода страницы
+        start (int): Позиция, с которой искать (чтобы не просматривать текст повторно)
+
+    Returns:
+        bool: True, если дальше страницу можно не читать
+    """
+    pattern = DOWNLOAD_LINK_BYTES_RE if isinstance(page_head, (bytes, bytearray)) else DOWNLOAD_LINK_RE
+    return pattern.search(page_head, start) is not None
+
+
+class PageHeadReader:
+    """
+    Накопитель начала страницы для потокового чтения: принимает блоки байтов
+    и сообщает, когда прочитанного достаточно для проверки обновлений
+    """
+    def __init__(self, encoding, max_bytes):
+        """
+        Args:
+            encoding (str): Кодировка страницы
+            max_bytes (int): Предел чтения в байтах
+        """
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.data = bytearray()
+
+    def feed(self, chunk):
+        """
+        Добавляет очередной блок ответа
+
+        Args:
+            chunk (bytes): Блок данных
+
+        Returns:
+            bool: True, если дальше страницу можно не читать
+        """
+        # Ссылка могла попасть на границу блоков, поэтому ищем с небольшим перекрытием
+        search_from = max(0, len(self.data) - 512)
+        self.data += chunk
+        self.bytes_read += len(chunk)
+        return topic_head_complete(self.data, search_from) or self.bytes_read >= self.max_bytes
+
+    def finish(self, raw=False):
+        """
+        Завершает чтение
+
+        Args:
+            raw (bool): Вернуть байты без декодирования
+
+        Returns:
+            str or bytes: Прочитанное начало страницы
+        """
+        if raw:
+            return bytes(self.data)
+        return self.data.decode(self.encoding, errors='replace')
+
+
+def benchmark(page_content, runs=10, encoding='windows-1251'):
+    """
+    Сравнивает время разбора страницы однопроходным извлечением и через BeautifulSoup
+
+    Args:
+        page_content (bytes): HTML-код страницы
+        runs (int): Сколько раз разобрать страницу каждым способом
+        encoding (str): Кодировка страницы
+
+    Returns:
+        list: [(способ, тип страницы, миллисекунд на страницу)]
+    """
+    text = page_content.decode(encoding, errors='replace')
+    results = []
+    for name, extract in (('extract_topic', extract_topic), ('BeautifulSoup', extract_topic_soup)):
+        for content in (text, page_content):
+            started = time.perf_counter()
+            for _ in range(runs):
+                extract(content, encoding)
+            results.append((name, type(content).__name__, (time.perf_counter() - started) / runs * 1000))
+    return results
+
+
+if __name__ == '__main__':
+    # python topic_parser.py page.html [runs] - сравнение с BeautifulSoup на сохраненной странице раздачи
+    if len(sys.argv) < 2:
+        print("Использование: python topic_parser.py <файл страницы> [число повторов]")
+        sys.exit(1)
+    with open(sys.argv[1], 'rb') as f:
+        content = f.read()
+    total_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"Размер страницы: {len(content) // 1024} КБ, повторов: {total_runs}")
+    timings = benchmark(content, total_runs)
+    for name, kind, ms in timings:
+        print(f"{name} ({kind}): {ms:.2f} мс")
+    fast = {kind: ms for name, kind, ms in timings if name == 'extract_topic'}
+    for name, kind, ms in timings:
+        if name != 'extract_topic':
+            print(f"Ускорение ({kind}): в {ms / fast[kind]:.0f} раз")
@@ -0,0 +1,87 @@
+import os
+import logging
+import tempfile
+from bencode import info_hash
+
+logger = logging.getLogger(__name__)
+
+# Временный файл (.part) старше этого возраста в секундах остался от прерванной записи;
+# более новый может в этот момент дописываться
+STALE_PART_AGE = 600
+
+
+class TorrentStore:
+    """
+    Хранилище торрент-файлов с адресацией по info-hash: одинаковые торренты
+    хранятся один раз, а запись выполняется атомарно (временный файл и переименование),
+    поэтому недописанный файл никогда не попадает в qBittorrent
+    """
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Каталог хранилища
+        """
+        self.directory = directory
+
+    def path_for(self, torrent_hash):
+        """
+        Возвращает путь к торрент-файлу в хранилище
+
+        Args:
+            torrent_hash (str): Info-hash торрента
+
+        Returns:
+            str: Путь к файлу
+        """
+        return os.path.join(self.directory, f"{torrent_hash}.torrent")
+
+    def get(self, torrent_hash):
+        """
+        Ищет торрент-файл в хранилище
+
+        Args:
+            torrent_hash (str): Info-hash торрента
+
+        Returns:
+            str or None: Путь к файлу или None, если файла нет
+        """
+        if not torrent_hash:
+            return None
+        path = self.path_for(torrent_hash)
+        return path if os.path.exists(path) else None
+
+    def put(self, torrent_data):
+        """
+        Сохраняет торрент-файл в хранилище
+
+        Args:
+            torrent_data (bytes): Содержимое .torrent файла
+
+        Returns:
+            tuple: (info_hash, путь к файлу)
+
+        Raises:
+            BencodeError: Если данные не являются торрент-файлом
+        """
+        torrent_hash = info_hash(torrent_data)
+        path = self.path_for(torrent_hash)
+
+        if os.path.exists(path):
+            logger.debug(f"Торрент {torrent_hash} уже есть в хранилище")
+            return torrent_hash, path
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(torrent_data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        logger.debug(f"Торрент {torrent_hash} сохранен в {path}")
+        return torrent_hash, path
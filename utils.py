@@ -1,7 +1,24 @@
 import os
+import threading
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
-from config import logger, NOTIFICATIONS_ENABLED, FILE_DIR
-from database import get_users, update_page_date, update_last_checked, get_pages
+from config import (
+    logger, NOTIFICATIONS_ENABLED, FILE_DIR, PIPELINE_QUEUE_SIZE, PIPELINE_FETCH_BATCH,
+    PIPELINE_PARSE_WORKERS, PIPELINE_DOWNLOAD_WORKERS, PIPELINE_UPLOAD_WORKERS, PIPELINE_NOTIFY_WORKERS,
+    PARSE_PROCESSES
+)
+from database import (
+    get_users, update_page_date, update_last_checked, get_pages, add_page, url_exists,
+    get_page_info_hash, update_page_info_hash
+)
+from bencode import BencodeError
+from torrent_store import TorrentStore
+from pipeline import Pipeline, Stage
+
+# Хранилище торрент-файлов с адресацией по info-hash
+torrent_store = TorrentStore(FILE_DIR)
+
+# Статистика этапов конвейера проверки, накапливается между циклами
+pipeline_stats = {}
 
 
 # Функция для проверки доступа пользователя
@@ -315,9 +332,88 @@ def get_qbittorrent_client():
             os.environ['HTTPS_PROXY'] = original_https_proxy
 
 
-# Функция для проверки изменений на страницах
-def check_pages(rutracker_api, BOT, specific_url=None):
+# Функция сохранения торрент-файла в хранилище
+def store_torrent(torrent_data, title=None):
+    """
+    Сохраняет скачанный торрент-файл в хранилище
+    
+    Args:
+        torrent_data (bytes): Содержимое .torrent файла
+        title (str): Название раздачи для логов
+        
+    Returns:
+        tuple: (info_hash, путь к файлу) или (None, None), если данные не являются
+               торрент-файлом или их не удалось сохранить
+    """
+    try:
+        return torrent_store.put(torrent_data)
+    except BencodeError as e:
+        logger.error(f"Скачанный файл для {title} не является торрент-файлом: {e}")
+    except OSError as e:
+        logger.error(f"Ошибка при сохранении торрент-файла для {title}: {e}")
+    return None, None
+
+# Функция получения торрент-файла раздачи: из хранилища или скачиванием
+def get_torrent(rutracker_api, url, title=None, info_hash=None, page_content=None, download_link=None):
+    """
+    Возвращает торрент-файл раздачи. Если торрент с info-hash из magnet-ссылки страницы
+    уже есть в хранилище (повторная отправка, возврат раздачи к прежней версии),
+    он не скачивается заново
     
+    Args:
+        rutracker_api (RutrackerAPI): Клиент трекера
+        url (str): URL страницы раздачи
+        title (str): Название раздачи для логов
+        info_hash (str): Info-hash торрента, указанный на странице
+        page_content (str): Уже полученный HTML-код страницы
+        download_link (str): Уже извлеченная ссылка на торрент-файл
+        
+    Returns:
+        tuple: (info_hash, путь к файлу) или (None, None), если торрент получить не удалось
+    """
+    info_hash = info_hash.upper() if info_hash else None
+    torrent_file_path = torrent_store.get(info_hash)
+    if torrent_file_path:
+        logger.info(f"Торрент {info_hash} для {title} уже есть в хранилище, скачивание пропущено")
+        return info_hash, torrent_file_path
+    
+    torrent_data = rutracker_api.download_torrent(url, page_content=page_content, download_link=download_link)
+    return store_torrent(torrent_data, title) if torrent_data else (None, None)
+
+# Состояние проверки страницы в конвейере
+class PageCheck:
+    """
+    Состояние проверки одной страницы при прохождении конвейера
+    """
+    def __init__(self, page):
+        self.page_id, self.title, self.url, self.old_date, self.last_checked = page
+        self.skipped = False
+        self.modified = False
+        self.page_content = None
+        self.new_date = None
+        self.download_link = None
+        self.info_hash = None
+        self.torrent_file_path = None
+        self.signature = None
+        self.committed = False
+
+# Функция для проверки изменений на страницах
+def check_pages(rutracker_api, BOT, specific_url=None, page_ids=None, progress=None):
+    """
+    Проверяет страницы на обновления. Страницы проходят конвейер
+    fetch → parse → download → upload → notify: у каждого этапа свой пул потоков,
+    поэтому медленная отправка в qBittorrent или в Telegram не задерживает опрос трекера
+
+    Args:
+        rutracker_api (RutrackerAPI): Клиент трекера
+        BOT: Бот для уведомлений
+        specific_url (str): Проверить только страницу с этим URL
+        page_ids (iterable): Проверить только страницы с этими ID (по умолчанию все)
+        progress (callable): progress(done, total) - вызывается по мере обработки страниц
+
+    Returns:
+        bool: True, если найдены обновления
+    """
     logger.info("Начата проверка страниц на обновления")
     
     try:
@@ -328,77 +424,251 @@ def check_pages(rutracker_api, BOT, specific_url=None):
             logger.info("Нет страниц для проверки")
             return False
         
-        updates_found = False
-        
-        for page in pages:
-            page_id, title, url, old_date, last_checked = page
+        # Если указан specific_url, пропускаем остальные страницы
+        if specific_url:
+            pages = [page for page in pages if page[2] == specific_url]
+        
+        # Если указаны page_ids, проверяем только эти страницы (плановая проверка по очереди)
+        if page_ids is not None:
+            page_ids = set(page_ids)
+            pages = [page for page in pages if page[0] in page_ids]
+            if not pages:
+                return False
+        
+        total = len(pages)
+        if progress:
+            progress(0, total)
+        
+        urls = list(dict.fromkeys(page[2] for page in pages))
+        
+        # Сначала отбираем изменившиеся раздачи пакетным API (один запрос на 100 раздач)
+        changed_topics = None
+        if not specific_url and rutracker_api.bulk_check_enabled:
+            changed_topics = rutracker_api.get_changed_topics(urls)
+            urls = [url for url in urls if url in changed_topics]
+        
+        state = {'done': 0, 'skipped': 0, 'updates_found': False}
+        state_lock = threading.Lock()
+        
+        def fetch(checks):
+            # Получаем страницы пачкой параллельно условными запросами в обход кэша:
+            # длительность этапа ограничена лимитом частоты запросов, а не задержкой сети
+            fetched = rutracker_api.get_pages_if_modified(list(dict.fromkeys(check.url for check in checks)))
+            for check in checks:
+                # Трекер временно недоступен: страница будет проверена в следующем цикле
+                if check.url not in fetched:
+                    check.skipped = True
+                    continue
+                check.modified, check.page_content = fetched[check.url]
+                if changed_topics is not None:
+                    check.signature = changed_topics[check.url]
+            return checks
+        
+        def commit(check):
+            # Состояние раздачи запоминается только после того, как обновление
+            # обработано до конца или подтверждено, что его нет
+            check.committed = True
+            rutracker_api.mark_topic_checked(check.url, check.signature)
+        
+        def parse(check):
+            if check.skipped:
+                return None
+            logger.debug(f"Проверка страницы: {check.title} (ID: {check.page_id})")
             
-            # Если указан specific_url, пропускаем остальные страницы
-            if specific_url and url != specific_url:
-                continue
+            if not check.modified:
+                logger.debug(f"Страница {check.title} (ID: {check.page_id}) не изменилась")
+                commit(check)
+                return None
+                
+            if not check.page_content:
+                logger.error(f"Не удалось получить содержимое страницы {check.title} (ID: {check.page_id})")
+                return None
             
-            logger.debug(f"Проверка страницы: {title} (ID: {page_id})")
+            # Страница изменилась: копия в кэше страниц устарела, и кнопки обработчиков
+            # бота не должны показывать старые дату и ссылку до истечения ее срока
+            rutracker_api.invalidate_page(check.url)
             
-            try:
-                # Получаем содержимое страницы
-                page_content = rutracker_api.get_page_content(url)
-                if not page_content:
-                    logger.error(f"Не удалось получить содержимое страницы {title} (ID: {page_id})")
-                    continue
-                
-                # Получаем новую дату обновления
-                new_date = rutracker_api.parse_date(page_content)
-                
-                # Если дата обновления изменилась
-                if new_date and new_date != old_date:
-                    updates_found = True
-                    logger.info(f"Обнаружено обновление страницы: {title} (ID: {page_id})")
-                    logger.info(f"Старая дата: {old_date}, Новая дата: {new_date}")
-                    
-                    # Обновляем дату в базе данных
-                    update_page_date(page_id, new_date)
-                    
-                    # Скачиваем торрент-файл
-                    file_path = os.path.join(FILE_DIR, f"{page_id}.torrent")
-                    torrent_file_path = rutracker_api.download_torrent_by_url(url, file_path)
-                    
-                    if torrent_file_path:
-                        logger.info(f"Торрент-файл скачан и сохранен в {torrent_file_path}")
-                        
-                        # Отправляем торрент-файл в qBittorrent
-                        qbit_result = upload_to_qbittorrent(torrent_file_path)
-                        if qbit_result:
-                            logger.info(f"Торрент-файл для страницы {title} отправлен в qBittorrent")
-                        else:
-                            logger.warning(f"Не удалось отправить торрент-файл для страницы {title} в qBittorrent")
-                        
-                        # Отправляем уведомление подписчикам
-                        message = (
-                            f"<b>Обновление!</b>\n"
-                            f"Раздача: {title}\n"
-                            f"Дата обновления: {new_date}\n"
-                            f"<a href='{url}'>Ссылка на страницу</a>"
-                        )
-                        keyboard = [[
-                            InlineKeyboardButton("Открыть в браузере", url=url)
-                        ]]
-                        send_notification_to_subscribers(BOT, message, keyboard)
-                    else:
-                        logger.error(f"Не удалось скачать торрент-файл для {title} (ID: {page_id})")
-            except Exception as e:
-                logger.error(f"Ошибка при проверке страницы {title} (ID: {page_id}): {e}")
-            finally:
-                # Обновляем время последней проверки
-                update_last_checked(page_id)
+            # Получаем новую дату обновления и ссылку на торрент одним разбором страницы;
+            # дальше по конвейеру идут только извлеченные поля, а не сама страница
+            topic = rutracker_api.parse_topic(check.page_content, check.url)
+            check.page_content = None
+            check.new_date = topic['date'] if topic else None
+            check.download_link = topic['download_link'] if topic else None
+            check.info_hash = topic['info_hash'] if topic else None
+            
+            # Если дата обновления изменилась
+            if not check.new_date:
+                return None
+            if check.new_date == check.old_date:
+                commit(check)
+                return None
+            logger.info(f"Обнаружено обновление страницы: {check.title} (ID: {check.page_id})")
+            logger.info(f"Старая дата: {check.old_date}, Новая дата: {check.new_date}")
+            return check
+        
+        def download(check):
+            # Скачиваем торрент-файл и сохраняем его в хранилище (если его там еще нет)
+            new_hash, check.torrent_file_path = get_torrent(
+                rutracker_api, check.url, check.title, check.info_hash, download_link=check.download_link
+            )
+            
+            if not check.torrent_file_path:
+                logger.error(f"Не удалось скачать торрент-файл для {check.title} (ID: {check.page_id})")
+                return None
+            logger.info(f"Торрент-файл сохранен в {check.torrent_file_path}")
+            
+            # Дату в базе данных обновляем только после сохранения торрента: если скачать
+            # его не удалось, обновление будет обнаружено снова при следующей проверке
+            update_page_date(check.page_id, check.new_date)
+            commit(check)
+            
+            # Если изменилось только оформление раздачи, торрент остался прежним:
+            # повторная отправка в qBittorrent и уведомление не нужны
+            if new_hash == get_page_info_hash(check.page_id):
+                logger.info(f"Торрент страницы {check.title} (ID: {check.page_id}) не изменился, отправка пропущена")
+                return None
+            update_page_info_hash(check.page_id, new_hash)
+            with state_lock:
+                state['updates_found'] = True
+            return check
+        
+        def upload(check):
+            # Отправляем торрент-файл в qBittorrent
+            qbit_result = upload_to_qbittorrent(check.torrent_file_path)
+            if qbit_result:
+                logger.info(f"Торрент-файл для страницы {check.title} отправлен в qBittorrent")
+            else:
+                logger.warning(f"Не удалось отправить торрент-файл для страницы {check.title} в qBittorrent")
+            return check
+        
+        def notify(check):
+            # Отправляем уведомление подписчикам
+            message = (
+                f"<b>Обновление!</b>\n"
+                f"Раздача: {check.title}\n"
+                f"Дата обновления: {check.new_date}\n"
+                f"<a href='{check.url}'>Ссылка на страницу</a>"
+            )
+            keyboard = [[
+                InlineKeyboardButton("Открыть в браузере", url=check.url)
+            ]]
+            send_notification_to_subscribers(BOT, message, keyboard)
+            return check
+        
+        def finish(check):
+            # Обновляем время последней проверки (кроме страниц, запрос которых отложен)
+            if not check.skipped:
+                update_last_checked(check.page_id)
+            # Изменившаяся страница не обработана до конца: без валидаторов следующий
+            # условный запрос получит ее целиком
+            if check.modified and not check.committed:
+                rutracker_api.forget_validators(check.url)
+            with state_lock:
+                state['done'] += 1
+                if check.skipped:
+                    state['skipped'] += 1
+                if progress:
+                    progress(state['done'], total)
+        
+        pipeline = Pipeline([
+            Stage("fetch", fetch, 1, PIPELINE_QUEUE_SIZE),
+            # Потоков разбора не меньше, чем процессов в пуле разбора, чтобы все процессы были заняты
+            Stage("parse", parse, max(PIPELINE_PARSE_WORKERS, PARSE_PROCESSES), PIPELINE_QUEUE_SIZE),
+            Stage("download", download, PIPELINE_DOWNLOAD_WORKERS, PIPELINE_QUEUE_SIZE),
+            Stage("upload", upload, PIPELINE_UPLOAD_WORKERS, PIPELINE_QUEUE_SIZE),
+            Stage("notify", notify, PIPELINE_NOTIFY_WORKERS, PIPELINE_QUEUE_SIZE),
+        ], on_done=finish, stats=pipeline_stats)
+        pipeline.start()
+        
+        # Страницы с одинаковым URL попадают в одну пачку и получают общий результат запроса
+        checks_by_url = {}
+        for page in pages:
+            check = PageCheck(page)
+            # Раздача не изменилась по данным пакетного API
+            if changed_topics is not None and check.url not in changed_topics:
+                finish(check)
+                continue
+            checks_by_url.setdefault(check.url, []).append(check)
         
-        if not updates_found:
+        try:
+            batch, batch_urls = [], 0
+            for checks in checks_by_url.values():
+                batch.extend(checks)
+                batch_urls += 1
+                if batch_urls >= PIPELINE_FETCH_BATCH:
+                    pipeline.submit(batch)
+                    batch, batch_urls = [], 0
+            if batch:
+                pipeline.submit(batch)
+        finally:
+            pipeline.close()
+        
+        if state['skipped']:
+            logger.warning(f"Проверка {state['skipped']} страниц отложена: трекер временно недоступен")
+        
+        if not state['updates_found']:
             logger.info("Обновлений не найдено")
         
-        return updates_found
+        return state['updates_found']
     except Exception as e:
         logger.error(f"Ошибка при проверке страниц: {e}")
         return False
 
+# Функция добавления страницы в мониторинг
+def add_topic(url, rutracker_api):
+    """
+    Добавляет страницу в мониторинг: получает ее один раз, извлекает заголовок,
+    дату и ссылку на торрент, скачивает торрент-файл и отправляет его в qBittorrent
+    
+    Args:
+        url (str): URL страницы
+        rutracker_api: Экземпляр RutrackerAPI
+        
+    Returns:
+        dict: {'page_id', 'title', 'existing_id', 'date', 'file_path', 'uploaded'}.
+              page_id равен None, если страница уже отслеживается
+    """
+    result = {
+        'page_id': None, 'title': None, 'existing_id': None,
+        'date': None, 'file_path': None, 'uploaded': False
+    }
+    
+    # Проверяем дубликат до обращения к трекеру
+    existing_page = url_exists(url)
+    if existing_page:
+        result['existing_id'], result['title'] = existing_page
+        logger.info(f"Страница с URL {url} уже существует с ID {result['existing_id']}")
+        return result
+    
+    topic = rutracker_api.fetch_topic(url) or {'title': 'No Title', 'date': None, 'download_link': None}
+    logger.debug(f"Получен заголовок: {topic['title']}")
+    
+    page_id, title, existing_id = add_page(topic['title'], url, topic['date'])
+    result.update(page_id=page_id, title=title, existing_id=existing_id, date=topic['date'])
+    if page_id is None:
+        return result
+    
+    # Скачиваем торрент-файл по уже извлеченной ссылке
+    if topic['download_link']:
+        torrent_data = rutracker_api.download_torrent(url, download_link=topic['download_link'])
+        if torrent_data:
+            new_hash, result['file_path'] = store_torrent(torrent_data, title)
+    else:
+        logger.error(f"Ссылка на загрузку торрента не найдена для {url}")
+    
+    if result['file_path']:
+        logger.info(f"Торрент-файл для новой страницы '{title}' сохранен в {result['file_path']}")
+        update_page_info_hash(page_id, new_hash)
+        result['uploaded'] = upload_to_qbittorrent(result['file_path'])
+        if result['uploaded']:
+            logger.info(f"Торрент-файл для страницы {title} отправлен в qBittorrent")
+        else:
+            logger.warning(f"Не удалось отправить торрент-файл для страницы {title} в qBittorrent")
+    else:
+        logger.error(f"Ошибка при скачивании торрент-файла для страницы {title}")
+    
+    return result
+
 # Декораторы доступа
 def restricted(user_exists_func, add_user_func, get_users_func):
    